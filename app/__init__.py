@@ -2,27 +2,109 @@
 Expense Tracker Pro - aplikacja do śledzenia wydatków z rozpoznawaniem mowy
 """
 
-from flask import Flask
-from flask_cors import CORS
 import os
+import queue
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, WatchedFileHandler
 
 __version__ = '1.0.0'
 
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_FORMATTER = logging.Formatter(LOG_FORMAT)
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# Set by configure_logging; replaced in forked children by _restart_log_listener
+_log_queue_handler = None
+_log_listener = None
+
+# Directories ensure_directory has already checked in this process
+_READY_DIRECTORIES = set()
+
+
+def configure_logging(log_file=None):
+    """
+    Send log records through a queue to the log file and the console
+    Request threads only enqueue; a listener thread does the writes
+    Runs once per process; handlers added to the root logger by someone else are kept, and
+    the console handler is only added when there are none and LOG_CONSOLE is not '0'
+    The file is only rotated here when LOG_ROTATE is '1' (the single-process dev server, see run.py):
+    gunicorn workers or WSGI processes would each roll the same file over and overwrite each other's
+    backups, so they use a WatchedFileHandler, which reopens the file after an external logrotate
+    """
+    global _log_queue_handler
+    if _log_queue_handler is not None:
+        return
+
+    root = logging.getLogger()
+    log_file = log_file or os.environ.get('LOG_FILE', 'app.log')
+    if os.environ.get('LOG_ROTATE', '0') == '1':
+        file_handler = RotatingFileHandler(
+            log_file,
+            maxBytes=LOG_MAX_BYTES,
+            backupCount=LOG_BACKUP_COUNT,
+            encoding='utf-8'
+        )
+    else:
+        file_handler = WatchedFileHandler(log_file, encoding='utf-8')
+    handlers = [file_handler]
+    if not root.handlers and os.environ.get('LOG_CONSOLE', '1') != '0':
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(LOG_FORMATTER)
+
+    _log_queue_handler = QueueHandler(queue.Queue(-1))
+    _start_log_listener(*handlers)
+    # fork() copies the queue but not the listener thread (gunicorn workers forked from a preloaded app)
+    os.register_at_fork(after_in_child=_restart_log_listener)
+
+    root.setLevel(logging.INFO)
+    root.addHandler(_log_queue_handler)
+
+
+def _start_log_listener(*handlers):
+    """Start the thread that writes queued records to the handlers"""
+    global _log_listener
+    _log_listener = QueueListener(_log_queue_handler.queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(_log_listener.stop)
+
+
+def _restart_log_listener():
+    """Give a forked child its own queue and listener thread, one per worker process"""
+    _log_queue_handler.queue = queue.Queue(-1)
+    _start_log_listener(*_log_listener.handlers)
+
+
 # Konfiguracja podstawowego loggera
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.FileHandler("app.log"), logging.StreamHandler()]
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 
+def ensure_directory(path):
+    """
+    Create a directory if it is missing, checking each path only once per process
+    (os.makedirs(exist_ok=True) still costs a failing mkdir on every call)
+    """
+    if path in _READY_DIRECTORIES:
+        return
+    if not os.path.isdir(path):
+        os.makedirs(path, exist_ok=True)
+    _READY_DIRECTORIES.add(path)
+
+
 def create_app(config_object=None):
 
+    # Imported here so importing the package (e.g. for configure_logging) stays cheap
+    from flask import Flask
+    from flask_cors import CORS
     from app.config import Config
+    from app.json_provider import ORJSONProvider
 
     if os.environ.get('ALWAYSDATA_ENV'):
+        # Served by the AlwaysData frontend (see README); Flask only builds these URLs
         static_url_path = '/expenses/static'
     else:
         # Locally - always without prefix
@@ -34,6 +116,7 @@ def create_app(config_object=None):
                 template_folder='../templates')
 
     CORS(app)
+    app.json = ORJSONProvider(app)
 
     if config_object:
         app.config.from_object(config_object)
@@ -41,20 +124,22 @@ def create_app(config_object=None):
         from app.config import Config
         app.config.from_object(Config)
 
-        # Log environment info
-        logger.info("=" * 60)
-        logger.info(f"STARTING APPLICATION")
-        logger.info(f"ENVIRONMENT: {Config.ENVIRONMENT}")
-        logger.info(f"DATABASE: {Config.DB_NAME}")
-        logger.info(f"DATABASE HOST: {Config.DB_HOST}")
-        logger.info(f"APP URL: {Config.APP_URL}")
-        logger.info("=" * 60)
+        # Log environment info (one record for the whole banner)
+        logger.info("\n".join((
+            "=" * 60,
+            "STARTING APPLICATION",
+            f"ENVIRONMENT: {Config.ENVIRONMENT}",
+            f"DATABASE: {Config.DB_NAME}",
+            f"DATABASE HOST: {Config.DB_HOST}",
+            f"APP URL: {Config.APP_URL}",
+            "=" * 60
+        )))
 
     app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
     app.config['TEMPLATES_AUTO_RELOAD'] = True
 
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    os.makedirs(app.config['REPORT_FOLDER'], exist_ok=True)
+    ensure_directory(app.config['UPLOAD_FOLDER'])
+    ensure_directory(app.config['REPORT_FOLDER'])
 
     with app.app_context():
 
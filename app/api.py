@@ -1,5 +1,6 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app
 import datetime
+import functools
 import logging
 import json
 
@@ -136,15 +137,23 @@ def process_manual_expense():
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
 
+@functools.lru_cache(maxsize=8)
+def _categories_json(categories):
+    """Serialized /categories body, reused while the category list is unchanged"""
+    return json.dumps({
+        "success": True,
+        "categories": list(categories)
+    })
+
+
 @api_bp.route('/categories', methods=['GET'])
 def get_categories():
     """Endpoint to get all available expense categories"""
     try:
-        categories = db_manager.get_all_categories()
-        return jsonify({
-            "success": True,
-            "categories": categories
-        })
+        # DBManager serves the list from its category cache; the JSON is keyed on its contents,
+        # so adding, renaming or deleting a category produces a fresh body
+        categories = tuple(db_manager.get_all_categories())
+        return Response(_categories_json(categories), mimetype='application/json')
     except Exception as e:
         logger.error(f"Error fetching categories: {str(e)}", exc_info=True)
         return jsonify({"error": f"Failed to fetch categories: {str(e)}"}), 500
@@ -239,27 +248,42 @@ def delete_category(category_id):
 
 @api_bp.route('/view-expenses', methods=['GET'])
 def view_expenses():
-    """API endpoint to view expenses with pagination and filtering"""
+    """
+    API endpoint to view expenses with pagination and filtering
+    With after_date/after_id (from next_cursor) pages are read by keyset; total, page and total_pages
+    are then null, and clients follow next_cursor until it is null
+    """
     try:
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 10))
         category = request.args.get('category')
         needs_review = request.args.get('needs_review', 'false').lower() == 'true'
+        after_date = request.args.get('after_date')
+        after_id = request.args.get('after_id', type=int)
 
         expenses, total, needs_review_count = db_manager.get_expenses(
             page=page,
             per_page=per_page,
             category=category,
-            needs_review=needs_review
+            needs_review=needs_review,
+            after_date=after_date,
+            after_id=after_id
         )
 
+        # Cursor for keyset pagination of the next page
+        next_cursor = None
+        if len(expenses) == per_page:
+            next_cursor = {"after_date": expenses[-1]['date'], "after_id": expenses[-1]['id']}
+
+        keyset = total is None
         return jsonify({
             "expenses": expenses,
             "total": total,
-            "page": page,
+            "page": None if keyset else page,
             "per_page": per_page,
-            "total_pages": (total + per_page - 1) // per_page,
-            "needs_review_count": needs_review_count
+            "total_pages": None if keyset else (total + per_page - 1) // per_page,
+            "needs_review_count": needs_review_count,
+            "next_cursor": next_cursor
         })
 
     except Exception as e:
@@ -1,7 +1,10 @@
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+# AlwaysData sets the environment in its site configuration (wsgi.py marks it with ALWAYSDATA_ENV),
+# so the WSGI workers there skip importing python-dotenv and searching for a .env file
+if not os.environ.get('ALWAYSDATA_ENV'):
+    from dotenv import load_dotenv
+    load_dotenv()
 
 
 class Config:
@@ -33,12 +36,21 @@ class Config:
         REPORT_FOLDER = 'reports'
         APP_URL = 'http://localhost:5000'
 
+    # Whisper results keyed by SHA-256 of the audio, so re-sent recordings are not transcribed twice
+    TRANSCRIPTION_CACHE_FOLDER = os.environ.get(
+        'TRANSCRIPTION_CACHE_FOLDER', os.path.join(UPLOAD_FOLDER, 'transcriptions')
+    )
+
     # File upload settings
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
 
     # API settings
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+    OPENAI_RPM_LIMIT = int(os.environ.get('OPENAI_RPM_LIMIT', 500))
+    OPENAI_TPM_LIMIT = int(os.environ.get('OPENAI_TPM_LIMIT', 200000))
     DISCORD_BOT_TOKEN = os.environ.get('DISCORD_BOT_TOKEN')
+    # Skip the OpenAI call for transcriptions without an amount; set to False if real expenses get dropped
+    EXPENSE_AMOUNT_PRECHECK = os.environ.get('EXPENSE_AMOUNT_PRECHECK', 'True') == 'True'
 
     # Email settings
     EMAIL_SENDER = os.environ.get('EMAIL_SENDER')
@@ -9,6 +9,8 @@ import pickle
 import os
 import logging
 
+from app import ensure_directory
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,7 +22,7 @@ class ExpenseLearner:
         self.model = None
         self.min_samples_per_category = 3
 
-        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        ensure_directory(os.path.dirname(model_path))
 
         self.load_model()
 
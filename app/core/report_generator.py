@@ -13,6 +13,7 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
 from app.database.db_manager import DBManager
+from app import ensure_directory
 from app.config import Config
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
 import os
@@ -73,7 +74,8 @@ def generate_report(db_manager, categories=None, start_date=None, end_date=None,
             categories=categories,
             start_date=start_date,
             end_date=end_date,
-            group_by=group_by
+            group_by=group_by,
+            include_detailed=True
         )
 
         # Generate report name
@@ -147,7 +149,7 @@ def create_visualizations(df, report_name, categories=None):
 
         # Create directory for charts
         chart_dir = os.path.join(config.REPORT_FOLDER, 'charts')
-        os.makedirs(chart_dir, exist_ok=True)
+        ensure_directory(chart_dir)
 
         # 1. Spending over time chart (line chart)
         if 'period_label' in df.columns and 'total_amount' in df.columns:
@@ -1,23 +1,259 @@
+import os
+import re
 import pymysql
 import datetime
 import logging
+import inspect
+import functools
 import json
+import orjson
+import time
+import threading
+from dbutils.pooled_db import PooledDB
 from app.config import Config
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Connection pool sizing (shared by all DBManager instances in the process)
+POOL_MIN_CACHED = 5
+POOL_MAX_CACHED = 20
+POOL_MAX_CONNECTIONS = 50
+
+# Socket timeouts (seconds) for pooled connections
+POOL_CONNECT_TIMEOUT = 2
+POOL_READ_TIMEOUT = 10
+
+# Seconds a cached category name -> id map stays valid without an explicit invalidation
+CATEGORY_CACHE_TTL = 60
+
+# Plain tuple cursor for hot paths that only need positional columns
+TUPLE_CURSOR = pymysql.cursors.Cursor
+
+# Rows pulled per round-trip when streaming training data
+TRAINING_FETCH_SIZE = 500
+
+# Rows per multi-VALUES INSERT in add_expenses
+BULK_INSERT_BATCH_SIZE = 500
+
+
+# ISO-8601 rendering done by MySQL so rows arrive JSON-ready; % is doubled for pymysql formatting
+ISO_DATE_SQL = "DATE_FORMAT(date, '%%Y-%%m-%%dT%%H:%%i:%%s') AS date"
+ISO_CREATION_TIMESTAMP_SQL = "DATE_FORMAT(creation_timestamp, '%%Y-%%m-%%dT%%H:%%i:%%s') AS creation_timestamp"
+
+SQL_GET_EXPENSE = f"""
+    SELECT 
+        id, {ISO_DATE_SQL}, amount, vendor, category, 
+        description, {ISO_CREATION_TIMESTAMP_SQL}, 
+        audio_file_path, transcription
+    FROM expenses
+    WHERE id = %s
+"""
+
+# Stable query templates: every optional filter is always present and disabled by a NULL/0
+# parameter, so each query shape has one digest regardless of which filters a caller uses
+_EXPENSE_FILTERS_SQL = """
+    (%(category)s IS NULL OR category = %(category)s)
+    AND (%(start_date)s IS NULL OR date >= %(start_date)s)
+    AND (%(end_date)s IS NULL OR date <= %(end_date)s)
+    AND (%(vendor_like)s IS NULL OR vendor LIKE %(vendor_like)s)
+    AND (%(needs_review)s = 0 OR confidence_score < 0.70)
+    AND (%(after_id)s IS NULL OR date < %(after_date)s OR (date = %(after_date)s AND id < %(after_id)s))
+"""
+
+# MATCH needs the FULLTEXT index to exist, so it lives in a separate template
+_VENDOR_FULLTEXT_SQL = """
+    AND MATCH(vendor) AGAINST (%(vendor_terms)s IN BOOLEAN MODE)
+"""
+
+# ORDER BY uses expenses.date so it sorts on the column, not the formatted alias
+_LIST_EXPENSES_SQL = f"""
+    SELECT
+        id, {ISO_DATE_SQL}, amount, vendor, category,
+        description, {ISO_CREATION_TIMESTAMP_SQL}, confidence_score,
+        COUNT(*) OVER () AS total_rows
+    FROM expenses
+    WHERE {{filters}}
+    ORDER BY expenses.date DESC, id DESC
+    LIMIT %(limit)s OFFSET %(offset)s
+"""
+
+_COUNT_EXPENSES_SQL = """
+    SELECT COUNT(*) as total FROM expenses WHERE {filters}
+"""
+
+SQL_LIST_EXPENSES = _LIST_EXPENSES_SQL.format(filters=_EXPENSE_FILTERS_SQL)
+SQL_LIST_EXPENSES_FULLTEXT = _LIST_EXPENSES_SQL.format(filters=_EXPENSE_FILTERS_SQL + _VENDOR_FULLTEXT_SQL)
+SQL_COUNT_EXPENSES = _COUNT_EXPENSES_SQL.format(filters=_EXPENSE_FILTERS_SQL)
+SQL_COUNT_EXPENSES_FULLTEXT = _COUNT_EXPENSES_SQL.format(filters=_EXPENSE_FILTERS_SQL + _VENDOR_FULLTEXT_SQL)
+
+_REPORT_FILTERS_SQL = """
+    (%(all_categories)s = 1 OR category IN %(categories)s)
+    AND (%(start_date)s IS NULL OR date >= %(start_date)s)
+    AND (%(end_date)s IS NULL OR date <= %(end_date)s)
+"""
+
+# (group expression, period label) per report grouping; % is doubled for pymysql formatting
+_REPORT_PERIODS = {
+    'day': ("DATE(date)", "DATE_FORMAT(date, '%%Y-%%m-%%d')"),
+    # Mode 1: weeks start on Monday
+    'week': ("YEARWEEK(date, 1)", "CONCAT(YEAR(date), '-', WEEKOFYEAR(date))"),
+    'month': ("DATE_FORMAT(date, '%%Y-%%m-01')", "DATE_FORMAT(date, '%%Y-%%m')"),
+    'year': ("YEAR(date)", "CAST(YEAR(date) AS CHAR)"),
+}
+
+# WITH ROLLUP adds per-period subtotals and a grand total to the same result set
+SQL_REPORT_GROUPED = {
+    group_by: f"""
+        SELECT 
+            {group_expr} AS period,
+            {period_format} AS period_label,
+            category,
+            SUM(amount) AS total_amount,
+            COUNT(*) AS transaction_count,
+            GROUPING(period) AS is_grand_total,
+            GROUPING(category) AS is_period_total
+        FROM expenses
+        WHERE {_REPORT_FILTERS_SQL}
+        GROUP BY period, category WITH ROLLUP
+        ORDER BY GROUPING(period), period, GROUPING(category), category
+    """
+    for group_by, (group_expr, period_format) in _REPORT_PERIODS.items()
+}
+
+SQL_REPORT_DETAILED = f"""
+    SELECT 
+        id, {ISO_DATE_SQL}, amount, vendor, category, description
+    FROM expenses
+    WHERE {_REPORT_FILTERS_SQL}
+    ORDER BY expenses.date, category
+"""
+
+# Inserts only when no expense with the same amount (and vendor/category, when given) falls inside the
+# time window; errors (truncation, NOT NULL) still raise
+SQL_INSERT_EXPENSE_UNLESS_DUPLICATE = """
+    INSERT INTO expenses
+    (date, amount, vendor, category, description, audio_file_path, transcription, confidence_score)
+    SELECT %(date)s, %(amount)s, %(vendor)s, %(category)s, %(description)s,
+           %(audio_file_path)s, %(transcription)s, %(confidence_score)s
+    FROM DUAL
+    WHERE NOT EXISTS (
+        SELECT 1 FROM expenses
+        WHERE amount = %(amount)s
+        AND date BETWEEN %(date_from)s AND %(date_to)s
+        AND (%(vendor_filter)s IS NULL OR vendor = %(vendor_filter)s)
+        AND (%(category_filter)s IS NULL OR category = %(category_filter)s)
+    )
+"""
+
+# Window used by add_expense when looking for an existing copy of the same expense
+DUPLICATE_WINDOW_MINUTES = 10
+
+
+def _db_op(message, fallback=None, reraise=False):
+    """
+    Log a failed database operation once and return a fallback (or re-raise)
+    message is formatted with the call's arguments, e.g. "Error getting expense with ID {expense_id}";
+    a callable fallback is called with the exception. Tracebacks are only logged at DEBUG level
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                logger.error(f"{message.format(**bound.arguments)}: {str(e)}",
+                             exc_info=logger.isEnabledFor(logging.DEBUG))
+                if reraise:
+                    raise
+                return fallback(e) if callable(fallback) else fallback
+
+        return wrapper
+
+    return decorator
+
+
+def _fulltext_terms(text):
+    """
+    Build a BOOLEAN MODE query requiring every word as a prefix, e.g. 'biedr sklep' -> '+biedr* +sklep*'
+    Returns None when a word is below InnoDB's default minimum token size, so callers fall back to LIKE
+    """
+    words = re.findall(r'\w+', text)
+    if not words or any(len(word) < 3 for word in words):
+        return None
+    return ' '.join(f'+{word}*' for word in words)
+
+
+def _report_params(categories, start_date, end_date):
+    """Build the named parameters shared by the report templates"""
+    return {
+        # pymysql renders a tuple as (a, b, ...); the placeholder keeps IN () valid when unused
+        'all_categories': 0 if categories else 1,
+        'categories': tuple(categories) if categories else ('',),
+        'start_date': start_date or None,
+        'end_date': end_date or None
+    }
+
+
+def _split_report_rows(rows):
+    """Split WITH ROLLUP rows into (grouped, period_totals, grand_total)"""
+    grouped_data = []
+    period_totals = []
+    grand_total = {'total_amount': 0, 'transaction_count': 0}
+
+    # The flags are not part of the report columns
+    for row in rows:
+        is_grand_total = row.pop('is_grand_total')
+        is_period_total = row.pop('is_period_total')
+
+        if is_grand_total:
+            grand_total = {
+                'total_amount': row['total_amount'],
+                'transaction_count': row['transaction_count']
+            }
+        elif is_period_total:
+            del row['category']
+            period_totals.append(row)
+        else:
+            grouped_data.append(row)
+
+    return grouped_data, period_totals, grand_total
+
 
 class DBManager:
     """Database manager for expense tracking application"""
 
+    # Process-wide connection pools keyed by (host, user, database)
+    _pools = {}
+    _pools_lock = threading.Lock()
+    # Pools a forked child inherited from its parent, see _forget_inherited_pools
+    _inherited_pools = []
+
+    # Databases whose schema was verified in this process: key -> vendor FULLTEXT index available
+    _schema_checked = {}
+
+    # Process-wide category caches keyed like the pools: key -> (loaded_at, {name: id})
+    _category_caches = {}
+
     def __init__(self, host, user, password, database):
         """Initialize database connection parameters"""
         self.host = host
         self.user = user
         self.password = password
         self.database = database
-        self._ensure_database_setup()
+        self._has_vendor_fulltext = False
+
+        # Schema verification runs once per database per process; later instances reuse its result
+        has_vendor_fulltext = DBManager._schema_checked.get(self._connection_key)
+        if has_vendor_fulltext is None:
+            self._ensure_database_setup()
+            DBManager._schema_checked[self._connection_key] = self._has_vendor_fulltext
+        else:
+            self._has_vendor_fulltext = has_vendor_fulltext
 
     def __enter__(self):
         """Context manager protocol implementation"""
@@ -28,128 +264,267 @@ class DBManager:
         """Handling the end of the context block"""
         pass
 
+    def _get_pool(self):
+        """Return the shared connection pool for these credentials, creating it on first use"""
+        key = self._connection_key
+        pool = DBManager._pools.get(key)
+        if pool is None:
+            with DBManager._pools_lock:
+                pool = DBManager._pools.get(key)
+                if pool is None:
+                    pool = PooledDB(
+                        creator=pymysql,
+                        mincached=POOL_MIN_CACHED,
+                        maxcached=POOL_MAX_CACHED,
+                        maxconnections=POOL_MAX_CONNECTIONS,
+                        blocking=True,
+                        # No ping per borrow; DBUtils reconnects and retries if a cached connection has died
+                        ping=0,
+                        # Keep the rollback on return: with autocommit off, a plain SELECT opens a
+                        # transaction whose snapshot would otherwise leak into the next borrower
+                        reset=True,
+                        host=self.host,
+                        user=self.user,
+                        password=self.password,
+                        database=self.database,
+                        charset='utf8mb4',
+                        cursorclass=pymysql.cursors.DictCursor,
+                        autocommit=False,
+                        connect_timeout=POOL_CONNECT_TIMEOUT,
+                        read_timeout=POOL_READ_TIMEOUT
+                    )
+                    DBManager._pools[key] = pool
+                    logger.info(f"Created database connection pool for {self.user}@{self.host}/{self.database}")
+        return pool
+
+    @classmethod
+    def _forget_inherited_pools(cls):
+        """
+        Run in a forked child (e.g. a gunicorn worker of a preloaded app): the pooled sockets belong
+        to the parent, so the child opens its own pools on first use
+        The inherited pools are kept referenced, never closed: closing them would send QUIT on
+        the parent's connections
+        """
+        cls._inherited_pools.extend(cls._pools.values())
+        cls._pools = {}
+        cls._pools_lock = threading.Lock()
+
+    @property
+    def _connection_key(self):
+        """Key identifying the shared pool and caches for this database"""
+        return self.host, self.user, self.database
+
+    def _get_category_map(self):
+        """Return a fresh-enough {name: id} map of categories ordered by name, or None on cache miss"""
+        cached = DBManager._category_caches.get(self._connection_key)
+        if cached and time.monotonic() - cached[0] < CATEGORY_CACHE_TTL:
+            return cached[1]
+        return None
+
+    def _set_category_map(self, rows):
+        """Populate the category cache from (id, name) tuple rows"""
+        category_map = {name: category_id for category_id, name in rows}
+        DBManager._category_caches[self._connection_key] = (time.monotonic(), category_map)
+        return category_map
+
+    def _invalidate_category_cache(self):
+        """Drop cached categories after any category change"""
+        DBManager._category_caches.pop(self._connection_key, None)
+
     def _get_connection(self):
-        """Create and return a database connection"""
-        return pymysql.connect(
-            host=self.host,
-            user=self.user,
-            password=self.password,
-            database=self.database,
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        """
+        Borrow a database connection from the pool; closing it returns it to the pool
+        Cursors are DictCursor by default; pass TUPLE_CURSOR to conn.cursor() on hot paths
+        that don't need per-row dicts
+        """
+        # Looked up per borrow rather than kept on the instance, so a forked process gets its own pool
+        return self._get_pool().connection()
 
+    @_db_op("Database setup error", reraise=True)
     def _ensure_database_setup(self):
         """Ensure database tables are set up"""
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    # Check if tables exist, if not create them
-                    cursor.execute("""
-                        CREATE TABLE IF NOT EXISTS expenses (
-                            id INT AUTO_INCREMENT PRIMARY KEY,
-                            date DATETIME NOT NULL,
-                            amount DECIMAL(10, 2) NOT NULL,
-                            vendor VARCHAR(255),
-                            category VARCHAR(100),
-                            description TEXT,
-                            creation_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                            audio_file_path VARCHAR(255),
-                            transcription TEXT
-                        )
-                    """)
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                # Check if tables exist, if not create them
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS expenses (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        date DATETIME NOT NULL,
+                        amount DECIMAL(10, 2) NOT NULL,
+                        vendor VARCHAR(255),
+                        category VARCHAR(100),
+                        description TEXT,
+                        creation_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        audio_file_path VARCHAR(255),
+                        transcription TEXT
+                    )
+                """)
+
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS categories (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        name VARCHAR(100) UNIQUE NOT NULL,
+                        parent_category_id INT NULL,
+                        FOREIGN KEY (parent_category_id) REFERENCES categories(id)
+                    )
+                """)
+
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS reports (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        report_type VARCHAR(50) NOT NULL,
+                        parameters TEXT,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        file_path VARCHAR(255)
+                    )
+                """)
+
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS pending_categorizations (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        expense_id INT NOT NULL,
+                        predicted_category VARCHAR(100),
+                        confidence FLOAT,
+                        alternative_categories JSON,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        status VARCHAR(20) DEFAULT 'pending',
+                        FOREIGN KEY (expense_id) REFERENCES expenses(id) ON DELETE CASCADE
+                    )
+                """)
 
-                    cursor.execute("""
-                        CREATE TABLE IF NOT EXISTS categories (
-                            id INT AUTO_INCREMENT PRIMARY KEY,
-                            name VARCHAR(100) UNIQUE NOT NULL,
-                            parent_category_id INT NULL,
-                            FOREIGN KEY (parent_category_id) REFERENCES categories(id)
-                        )
-                    """)
+                self._migrate_alternative_categories_column(cursor)
 
-                    cursor.execute("""
-                        CREATE TABLE IF NOT EXISTS reports (
-                            id INT AUTO_INCREMENT PRIMARY KEY,
-                            report_type VARCHAR(50) NOT NULL,
-                            parameters TEXT,
-                            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                            file_path VARCHAR(255)
-                        )
-                    """)
+                # Check if default categories exist
+                cursor.execute("SELECT COUNT(*) AS count FROM categories")
+                category_count = cursor.fetchone()['count']
 
-                    cursor.execute("""
-                        CREATE TABLE IF NOT EXISTS pending_categorizations (
-                            id INT AUTO_INCREMENT PRIMARY KEY,
-                            expense_id INT NOT NULL,
-                            predicted_category VARCHAR(100),
-                            confidence FLOAT,
-                            alternative_categories TEXT,
-                            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                            status VARCHAR(20) DEFAULT 'pending',
-                            FOREIGN KEY (expense_id) REFERENCES expenses(id) ON DELETE CASCADE
-                        )
-                    """)
+                if category_count == 0:
+                    # Insert default categories (pymysql batches this into one multi-row INSERT)
+                    cursor.executemany(
+                        "INSERT INTO categories (name) VALUES (%s)",
+                        [(category,) for category in Config.DEFAULT_CATEGORIES]
+                    )
 
-                    # Check if default categories exist
-                    cursor.execute("SELECT COUNT(*) AS count FROM categories")
-                    category_count = cursor.fetchone()['count']
+                # The former unique index ignored category, so distinct same-day expenses were dropped;
+                # duplicates are only detected by the NOT EXISTS check of the insert
+                self._drop_index(cursor, 'expenses', 'idx_expense_dedup')
+
+                # Indexes behind the date/category filters, paginated listing and report grouping
+                self._ensure_index(
+                    cursor, 'expenses', 'idx_expenses_date',
+                    "CREATE INDEX idx_expenses_date ON expenses (date)"
+                )
+                self._ensure_index(
+                    cursor, 'expenses', 'idx_expenses_category_date',
+                    "CREATE INDEX idx_expenses_category_date ON expenses (category, date)"
+                )
+                self._ensure_index(
+                    cursor, 'expenses', 'idx_expenses_paged',
+                    "CREATE INDEX idx_expenses_paged ON expenses (date DESC, id, amount, vendor, category)"
+                )
+                self._has_vendor_fulltext = self._ensure_index(
+                    cursor, 'expenses', 'idx_expenses_vendor_ft',
+                    "CREATE FULLTEXT INDEX idx_expenses_vendor_ft ON expenses (vendor)"
+                )
+
+            conn.commit()
+            logger.info("Database schema verification completed successfully")
+
+    def _ensure_index(self, cursor, table, index_name, create_sql):
+        """
+        Create an index unless it already exists; unsupported or conflicting indexes only log a warning
+        Returns True if the index is available afterwards
+        """
+        cursor.execute("""
+            SELECT 1 FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+            LIMIT 1
+        """, (table, index_name))
 
-                    if category_count == 0:
-                        # Insert default categories
-                        for category in Config.DEFAULT_CATEGORIES:
-                            cursor.execute(
-                                "INSERT INTO categories (name) VALUES (%s)",
-                                (category,)
-                            )
+        if cursor.fetchone():
+            return True
 
-                conn.commit()
-                logger.info("Database schema verification completed successfully")
+        try:
+            cursor.execute(create_sql)
+            logger.info(f"Created index {index_name} on {table}")
+            return True
+        except pymysql.MySQLError as e:
+            logger.warning(f"Could not create index {index_name} on {table}: {str(e)}")
+            return False
 
-        except Exception as e:
-            logger.error(f"Database setup error: {str(e)}", exc_info=True)
-            raise
+    def _drop_index(self, cursor, table, index_name):
+        """Drop an index if it exists"""
+        cursor.execute("""
+            SELECT 1 FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+            LIMIT 1
+        """, (table, index_name))
+
+        if cursor.fetchone():
+            cursor.execute(f"DROP INDEX {index_name} ON {table}")
+            logger.info(f"Dropped index {index_name} on {table}")
+
+    def _migrate_alternative_categories_column(self, cursor):
+        """Convert a legacy TEXT alternative_categories column to native JSON"""
+        cursor.execute("""
+            SELECT DATA_TYPE AS data_type FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = 'pending_categorizations'
+              AND column_name = 'alternative_categories'
+        """)
+        column = cursor.fetchone()
+
+        if not column or column['data_type'].lower() != 'text':
+            return
 
+        try:
+            cursor.execute("ALTER TABLE pending_categorizations MODIFY alternative_categories JSON")
+            logger.info("Converted pending_categorizations.alternative_categories to JSON")
+        except pymysql.MySQLError as e:
+            logger.warning(f"Could not convert alternative_categories to JSON: {str(e)}")
+
+    @_db_op("Error checking for duplicate", fallback=False)
     def check_for_duplicate(self, date, amount, vendor=None, category=None, time_threshold_minutes=5):
         """
         Checks if a similar expense already exists in the database
         Returns True if a duplicate is found, False otherwise
         """
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    # Set the time range for the check
-                    date_from = date - datetime.timedelta(minutes=time_threshold_minutes)
-                    date_to = date + datetime.timedelta(minutes=time_threshold_minutes)
-
-                    # Basic search conditions
-                    query = """
-                        SELECT id FROM expenses
-                        WHERE amount = %s 
-                        AND date BETWEEN %s AND %s
-                    """
-                    params = [amount, date_from, date_to]
-
-                    # Add conditions for category and vendor if provided
-                    if vendor:
-                        query += " AND vendor = %s"
-                        params.append(vendor)
-
-                    if category:
-                        query += " AND category = %s"
-                        params.append(category)
-
-                    cursor.execute(query, params)
-                    result = cursor.fetchone()
-
-                    # If a result is found, then we have a duplicate
-                    return result is not None
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                return self._check_for_duplicate_with_cursor(
+                    cursor, date, amount, vendor, category, time_threshold_minutes
+                )
+
+    def _check_for_duplicate_with_cursor(self, cursor, date, amount, vendor=None, category=None,
+                                         time_threshold_minutes=5):
+        """Run the duplicate check on an already open cursor"""
+        # Set the time range for the check
+        date_from = date - datetime.timedelta(minutes=time_threshold_minutes)
+        date_to = date + datetime.timedelta(minutes=time_threshold_minutes)
+
+        # Basic search conditions
+        query = """
+            SELECT id FROM expenses
+            WHERE amount = %s 
+            AND date BETWEEN %s AND %s
+        """
+        params = [amount, date_from, date_to]
 
-        except Exception as e:
-            logger.error(f"Error checking for duplicate: {str(e)}", exc_info=True)
-            # In case of an error, assume it is not a duplicate
-            return False
+        # Add conditions for category and vendor if provided
+        if vendor:
+            query += " AND vendor = %s"
+            params.append(vendor)
 
+        if category:
+            query += " AND category = %s"
+            params.append(category)
+
+        cursor.execute(query, params)
+        result = cursor.fetchone()
+
+        # If a result is found, then we have a duplicate
+        return result is not None
+
+    @_db_op("Error adding expense", reraise=True)
     def add_expense(self, date, amount, vendor=None, category=None, description=None,
                     audio_file_path=None, transcription=None, needs_confirmation=False,
                     predicted_category=None, confidence_score=None, alternative_categories=None,
@@ -158,322 +533,434 @@ class DBManager:
         Add an expense record to the database
         Returns the ID of the newly created expense record, or 0 if it's a duplicate
         """
-        try:
-            # Check if a similar expense already exists
-            is_duplicate = self.check_for_duplicate(
-                date=date,
-                amount=amount,
-                vendor=vendor,
-                category=category,
-                time_threshold_minutes=10
-            )
-
-            if is_duplicate:
-                logger.warning(f"Duplicate expense detected: {date}, {amount}, {vendor}, {category}")
-                # Return 0 as a signal that it was a duplicate
-                return 0
-
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    # Ensure category exists
-                    if category:
-                        cursor.execute(
-                            "SELECT id FROM categories WHERE name = %s",
-                            (category,)
-                        )
-                        cat_result = cursor.fetchone()
+        # Category, expense and pending categorization share one transaction
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("START TRANSACTION")
+
+                # Ensure category exists (atomic against the UNIQUE index on name)
+                category_map = self._get_category_map()
+                category_added = bool(category) and (category_map is None or category not in category_map)
+                if category_added:
+                    cursor.execute(
+                        "INSERT INTO categories (name) VALUES (%s) ON DUPLICATE KEY UPDATE name = name",
+                        (category,)
+                    )
 
-                        if not cat_result:
-                            # Create new category if it doesn't exist
-                            cursor.execute(
-                                "INSERT INTO categories (name) VALUES (%s)",
-                                (category,)
-                            )
+                # Duplicate check and insert in one statement; no row inserted means a duplicate
+                window = datetime.timedelta(minutes=DUPLICATE_WINDOW_MINUTES)
+                cursor.execute(SQL_INSERT_EXPENSE_UNLESS_DUPLICATE, {
+                    'date': date,
+                    'amount': amount,
+                    'vendor': vendor or '',
+                    'category': category or 'Other',
+                    'description': description or '',
+                    'audio_file_path': audio_file_path or '',
+                    'transcription': transcription or '',
+                    'confidence_score': confidence_score,
+                    'date_from': date - window,
+                    'date_to': date + window,
+                    'vendor_filter': vendor or None,
+                    'category_filter': category or None
+                })
+
+                if cursor.rowcount == 0:
+                    conn.rollback()
+                    logger.warning(f"Duplicate expense detected: {date}, {amount}, {vendor}, {category}")
+                    # Return 0 as a signal that it was a duplicate
+                    return 0
+
+                # Get the ID of the last inserted row
+                expense_id = cursor.lastrowid
+
+                # If the expense requires category confirmation
+                if needs_confirmation:
+                    # Save to the pending categorization table
+                    alt_categories_json = orjson.dumps(alternative_categories or []).decode()
 
-                    # Insert expense record
                     cursor.execute("""
-                        INSERT INTO expenses
-                        (date, amount, vendor, category, description, audio_file_path, transcription, confidence_score)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                        INSERT INTO pending_categorizations
+                        (expense_id, predicted_category, confidence, alternative_categories)
+                        VALUES (%s, %s, %s, %s)
                     """, (
-                        date,
-                        amount,
-                        vendor or '',
-                        category or 'Other',
-                        description or '',
-                        audio_file_path or '',
-                        transcription or '',
-                        confidence_score
+                        expense_id,
+                        predicted_category,
+                        confidence_score,
+                        alt_categories_json
                     ))
 
-                    # Get the ID of the last inserted row
-                    expense_id = cursor.lastrowid
-
-                    # If the expense requires category confirmation
-                    if needs_confirmation:
-                        # Save to the pending categorization table
-                        alt_categories_json = json.dumps(alternative_categories or [])
-
-                        cursor.execute("""
-                            INSERT INTO pending_categorizations
-                            (expense_id, predicted_category, confidence, alternative_categories)
-                            VALUES (%s, %s, %s, %s)
-                        """, (
-                            expense_id,
-                            predicted_category,
-                            confidence_score,
-                            alt_categories_json
-                        ))
-
-                        # If a callback was provided and the expense was created
-                        if notification_callback and expense_id:
-                            # Fetch complete expense data
-                            expense = self.get_expense(expense_id)
-                            # Call the callback with the appropriate arguments
-                            notification_callback(
-                                expense=expense,
-                                current_category=category,
-                                predicted_category=predicted_category,
-                                alternatives=alternative_categories or []
-                            )
+            conn.commit()
+            logger.info(f"Added expense record with ID: {expense_id}")
+
+        if category_added:
+            self._invalidate_category_cache()
+
+        # Notify only after commit so the callback can read the new expense
+        if needs_confirmation and notification_callback and expense_id:
+            # Fetch complete expense data
+            expense = self.get_expense(expense_id)
+            # Call the callback with the appropriate arguments
+            notification_callback(
+                expense=expense,
+                current_category=category,
+                predicted_category=predicted_category,
+                alternatives=alternative_categories or []
+            )
 
-                conn.commit()
-                logger.info(f"Added expense record with ID: {expense_id}")
-                return expense_id
+        return expense_id
 
-        except Exception as e:
-            logger.error(f"Error adding expense: {str(e)}", exc_info=True)
-            raise
+    @_db_op("Error adding expenses in bulk", reraise=True)
+    def add_expenses(self, rows, time_threshold_minutes=DUPLICATE_WINDOW_MINUTES, batch_size=BULK_INSERT_BATCH_SIZE):
+        """
+        Add many expense records in a single transaction
+        Each row is a dict with add_expense's keyword arguments (date and amount required)
+        Returns a list of new expense IDs aligned with rows, with 0 for duplicates
+        """
+        if not rows:
+            return []
 
-    def get_expense(self, expense_id):
-        """Get a single expense record by ID"""
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute("""
-                        SELECT 
-                            id, date, amount, vendor, category, 
-                            description, creation_timestamp, 
-                            audio_file_path, transcription
-                        FROM expenses
-                        WHERE id = %s
-                    """, (expense_id,))
+        expense_ids = [0] * len(rows)
+        new_categories = []
+        confirmations = []
+
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("START TRANSACTION")
+
+                # Load every expense that could collide with the batch in one query
+                threshold = datetime.timedelta(minutes=time_threshold_minutes)
+                cursor.execute("""
+                    SELECT date, amount, vendor, category FROM expenses
+                    WHERE date BETWEEN %s AND %s
+                """, (
+                    min(row['date'] for row in rows) - threshold,
+                    max(row['date'] for row in rows) + threshold
+                ))
+                known = list(cursor.fetchall())
+
+                pending = []
+                for index, row in enumerate(rows):
+                    if self._is_duplicate_of(row, known, threshold):
+                        logger.warning(
+                            f"Duplicate expense detected: {row['date']}, {row['amount']}, "
+                            f"{row.get('vendor')}, {row.get('category')}"
+                        )
+                        continue
+
+                    # Later rows in the same batch are checked against this one too
+                    known.append({
+                        'date': row['date'],
+                        'amount': row['amount'],
+                        'vendor': row.get('vendor') or '',
+                        'category': row.get('category') or 'Other'
+                    })
+                    pending.append((index, row))
+
+                # Ensure all unknown categories exist with one multi-row upsert
+                category_map = self._get_category_map() or {}
+                new_categories = sorted({
+                    row['category'] for _, row in pending
+                    if row.get('category') and row['category'] not in category_map
+                })
+                if new_categories:
+                    cursor.execute(
+                        "INSERT INTO categories (name) VALUES "
+                        + ", ".join(["(%s)"] * len(new_categories))
+                        + " ON DUPLICATE KEY UPDATE name = name",
+                        new_categories
+                    )
 
-                    result = cursor.fetchone()
+                for start in range(0, len(pending), batch_size):
+                    batch = pending[start:start + batch_size]
+                    params = []
+                    for _, row in batch:
+                        params.extend((
+                            row['date'],
+                            row['amount'],
+                            row.get('vendor') or '',
+                            row.get('category') or 'Other',
+                            row.get('description') or '',
+                            row.get('audio_file_path') or '',
+                            row.get('transcription') or '',
+                            row.get('confidence_score')
+                        ))
 
-                    if result:
-                        # Convert datetime objects to ISO format strings for JSON serialization
-                        result['date'] = result['date'].isoformat()
-                        result['creation_timestamp'] = result['creation_timestamp'].isoformat()
+                    cursor.execute(
+                        "INSERT INTO expenses "
+                        "(date, amount, vendor, category, description, audio_file_path, transcription, confidence_score) "
+                        "VALUES " + ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s)"] * len(batch)),
+                        params
+                    )
 
-                    return result
+                    # A multi-row INSERT gets consecutive IDs starting at lastrowid
+                    # (innodb_autoinc_lock_mode <= 1)
+                    for offset, (index, _) in enumerate(batch):
+                        expense_ids[index] = cursor.lastrowid + offset
+
+                # pymysql folds an executemany INSERT ... VALUES into one multi-row statement
+                confirmations = [(index, row) for index, row in pending if row.get('needs_confirmation')]
+                if confirmations:
+                    cursor.executemany("""
+                        INSERT INTO pending_categorizations
+                        (expense_id, predicted_category, confidence, alternative_categories)
+                        VALUES (%s, %s, %s, %s)
+                    """, [
+                        (
+                            expense_ids[index],
+                            row.get('predicted_category'),
+                            row.get('confidence_score'),
+                            orjson.dumps(row.get('alternative_categories') or []).decode()
+                        )
+                        for index, row in confirmations
+                    ])
+
+            conn.commit()
+            logger.info(f"Added {len(pending)} of {len(rows)} expense records in bulk")
+
+        if new_categories:
+            self._invalidate_category_cache()
+
+        # Notify only after commit so the callbacks can read the new expenses
+        for index, row in confirmations:
+            notification_callback = row.get('notification_callback')
+            if notification_callback:
+                notification_callback(
+                    expense=self.get_expense(expense_ids[index]),
+                    current_category=row.get('category'),
+                    predicted_category=row.get('predicted_category'),
+                    alternatives=row.get('alternative_categories') or []
+                )
+
+        return expense_ids
+
+    @staticmethod
+    def _is_duplicate_of(row, known, threshold):
+        """Python mirror of the duplicate check SQL, run against loaded expenses"""
+        amount = round(float(row['amount']), 2)
+        for expense in known:
+            if round(float(expense['amount']), 2) != amount:
+                continue
+            if abs(expense['date'] - row['date']) > threshold:
+                continue
+            if row.get('vendor') and expense['vendor'] != row['vendor']:
+                continue
+            if row.get('category') and expense['category'] != row['category']:
+                continue
+            return True
+        return False
+
+    @_db_op("Error getting expense with ID {expense_id}")
+    def get_expense(self, expense_id):
+        """Get a single expense record by ID"""
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(SQL_GET_EXPENSE, (expense_id,))
 
-        except Exception as e:
-            logger.error(f"Error getting expense with ID {expense_id}: {str(e)}", exc_info=True)
-            return None
+                return cursor.fetchone()
 
+    @_db_op("Error retrieving expenses", fallback=lambda e: ([], 0, 0))
     def get_expenses(self, page=1, per_page=10, category=None, start_date=None,
-                     end_date=None, vendor=None, needs_review=False):
+                     end_date=None, vendor=None, needs_review=False, after_date=None, after_id=None):
         """
         Get a list of expenses with pagination and filtering
+        Passing after_date/after_id (the last row of the previous page) switches from OFFSET
+        to keyset pagination; total_count is then None, since the query only sees rows past the cursor
         Returns a tuple of (expenses_list, total_count, needs_review_count)
         """
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    # Build WHERE clause for filtering
-                    where_clauses = []
-                    params = []
-
-                    if category:
-                        where_clauses.append("category = %s")
-                        params.append(category)
-
-                    if start_date:
-                        where_clauses.append("date >= %s")
-                        params.append(start_date)
-
-                    if end_date:
-                        where_clauses.append("date <= %s")
-                        params.append(end_date)
-
-                    if vendor:
-                        where_clauses.append("vendor LIKE %s")
-                        params.append(f"%{vendor}%")
-
-                    if needs_review:
-                        where_clauses.append("confidence_score < 0.70")
-
-                    # Build WHERE clause string
-                    where_sql = ""
-                    if where_clauses:
-                        where_sql = "WHERE " + " AND ".join(where_clauses)
-
-                    # Get total count first
-                    count_sql = f"SELECT COUNT(*) as total FROM expenses {where_sql}"
-                    cursor.execute(count_sql, params)
-                    total = cursor.fetchone()['total']
-
-                    # Get count of expenses needing review
-                    cursor.execute("SELECT COUNT(*) as count FROM expenses WHERE confidence_score < 0.70")
-                    needs_review_count = cursor.fetchone()['count']
-
-                    # Calculate offset for pagination
-                    offset = (page - 1) * per_page
-
-                    # Get paginated results
-                    query_sql = f"""
-                        SELECT
-                            id, date, amount, vendor, category,
-                            description, creation_timestamp, confidence_score
-                        FROM expenses
-                        {where_sql}
-                        ORDER BY date DESC
-                        LIMIT %s OFFSET %s
-                    """
-
-                    # Add pagination parameters
-                    params.extend([per_page, offset])
-
-                    cursor.execute(query_sql, params)
-                    expenses = cursor.fetchall()
-
-                    # Convert datetime objects to strings for JSON serialization
+        # Seek past the previous page instead of walking OFFSET rows
+        keyset = after_date is not None and after_id is not None
+        vendor_terms = _fulltext_terms(vendor) if vendor and self._has_vendor_fulltext else None
+
+        params = {
+            'category': category or None,
+            'start_date': start_date or None,
+            'end_date': end_date or None,
+            'vendor_like': f"%{vendor}%" if vendor and not vendor_terms else None,
+            'vendor_terms': vendor_terms,
+            'needs_review': 1 if needs_review else 0,
+            'after_date': after_date if keyset else None,
+            'after_id': after_id if keyset else None,
+            'limit': per_page,
+            # Calculate offset for pagination
+            'offset': 0 if keyset else (page - 1) * per_page
+        }
+
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                # Get count of expenses needing review
+                cursor.execute("SELECT COUNT(*) as count FROM expenses WHERE confidence_score < 0.70")
+                needs_review_count = cursor.fetchone()['count']
+
+                # Get paginated results with the filtered total from a window function
+                cursor.execute(SQL_LIST_EXPENSES_FULLTEXT if vendor_terms else SQL_LIST_EXPENSES, params)
+                expenses = cursor.fetchall()
+
+                if expenses:
+                    total = expenses[0]['total_rows']
                     for expense in expenses:
-                        expense['date'] = expense['date'].isoformat()
-                        expense['creation_timestamp'] = expense['creation_timestamp'].isoformat()
+                        del expense['total_rows']
+                elif params['offset']:
+                    # Page past the end returns no rows to carry the total
+                    cursor.execute(SQL_COUNT_EXPENSES_FULLTEXT if vendor_terms else SQL_COUNT_EXPENSES, params)
+                    total = cursor.fetchone()['total']
+                else:
+                    total = 0
 
-                    return expenses, total, needs_review_count
+                if keyset:
+                    total = None
 
-        except Exception as e:
-            logger.error(f"Error retrieving expenses: {str(e)}", exc_info=True)
-            return [], 0, 0
+                return expenses, total, needs_review_count
 
+    @_db_op("Error getting pending categorization for expense {expense_id}")
     def get_pending_categorization(self, expense_id):
         """Get pending categorization for an expense"""
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute("""
-                        SELECT 
-                            id, expense_id, predicted_category, confidence, 
-                            alternative_categories, created_at, status
-                        FROM pending_categorizations
-                        WHERE expense_id = %s AND status = 'pending'
-                    """, (expense_id,))
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT 
+                        id, expense_id, predicted_category, confidence, 
+                        alternative_categories, created_at, status
+                    FROM pending_categorizations
+                    WHERE expense_id = %s AND status = 'pending'
+                """, (expense_id,))
 
-                    result = cursor.fetchone()
-
-                    if result and result.get('alternative_categories'):
-                        try:
-                            result['alternative_categories'] = json.loads(result['alternative_categories'])
-                        except:
-                            result['alternative_categories'] = []
+                result = cursor.fetchone()
 
-                    return result
+                if result:
+                    self._parse_alternative_categories(result)
 
-        except Exception as e:
-            logger.error(f"Error getting pending categorization for expense {expense_id}: {str(e)}", exc_info=True)
-            return None
+                return result
 
+    @_db_op("Error getting pending categorizations", fallback=lambda e: {})
+    def get_pending_categorizations(self, expense_ids):
+        """
+        Get pending categorizations for many expenses in one query
+        Returns a dict of {expense_id: row}; expenses without a pending categorization are absent
+        """
+        if not expense_ids:
+            return {}
+
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                # pymysql renders the tuple as (id1, id2, ...)
+                cursor.execute("""
+                    SELECT 
+                        id, expense_id, predicted_category, confidence, 
+                        alternative_categories, created_at, status
+                    FROM pending_categorizations
+                    WHERE expense_id IN %s AND status = 'pending'
+                    ORDER BY id
+                """, (tuple(expense_ids),))
+
+                pending = {}
+                for row in cursor.fetchall():
+                    pending.setdefault(row['expense_id'], self._parse_alternative_categories(row))
+
+                return pending
+
+    @staticmethod
+    def _parse_alternative_categories(row):
+        """Decode the alternative_categories JSON of a pending categorization row in place"""
+        if row.get('alternative_categories'):
+            try:
+                row['alternative_categories'] = orjson.loads(row['alternative_categories'])
+            except orjson.JSONDecodeError:
+                row['alternative_categories'] = []
+        return row
+
+    @staticmethod
+    def _commit_if_changed(conn, cursor, success_msg, missing_msg):
+        """Commit and log success when the last statement touched rows, otherwise log a warning"""
+        if cursor.rowcount > 0:
+            conn.commit()
+            logger.info(success_msg)
+            return True
+
+        logger.warning(missing_msg)
+        return False
+
+    @_db_op("Error updating categorization status for expense {expense_id}", fallback=False)
     def update_pending_categorization(self, expense_id, status='confirmed'):
         """Update status of pending categorization"""
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute("""
-                        UPDATE pending_categorizations
-                        SET status = %s
-                        WHERE expense_id = %s AND status = 'pending'
-                    """, (status, expense_id))
-
-                    if cursor.rowcount > 0:
-                        conn.commit()
-                        logger.info(f"Updated categorization status for expense {expense_id} to {status}")
-                        return True
-                    else:
-                        logger.warning(f"No pending categorization found for expense {expense_id}")
-                        return False
-
-        except Exception as e:
-            logger.error(f"Error updating categorization status for expense {expense_id}: {str(e)}", exc_info=True)
-            return False
-
-
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE pending_categorizations
+                    SET status = %s
+                    WHERE expense_id = %s AND status = 'pending'
+                """, (status, expense_id))
+
+                return self._commit_if_changed(
+                    conn, cursor,
+                    f"Updated categorization status for expense {expense_id} to {status}",
+                    f"No pending categorization found for expense {expense_id}"
+                )
+
+    @_db_op("Error updating expense with ID {expense_id}", fallback=False)
     def update_expense(self, expense_id, **kwargs):
         """
         Update an expense record
         Returns True if successful, False otherwise
         """
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    # Build SET part of the query
-                    set_parts = []
-                    params = []
-
-                    # Process each update field
-                    allowed_fields = ['date', 'amount', 'vendor', 'category', 'description', 'confidence_score']
-                    for field, value in kwargs.items():
-                        if field in allowed_fields and value is not None:
-                            set_parts.append(f"{field} = %s")
-                            params.append(value)
-
-                    if not set_parts:
-                        logger.warning("No valid fields provided for update")
-                        return False
-
-                    # Add expense ID to parameters
-                    params.append(expense_id)
-
-                    # Execute update query
-                    query = f"""
-                        UPDATE expenses 
-                        SET {", ".join(set_parts)}
-                        WHERE id = %s
-                    """
-
-                    cursor.execute(query, params)
-
-                    if cursor.rowcount > 0:
-                        conn.commit()
-                        logger.info(f"Updated expense record with ID: {expense_id}")
-                        return True
-                    else:
-                        logger.warning(f"No expense found with ID: {expense_id}")
-                        return False
-
-        except Exception as e:
-            logger.error(f"Error updating expense with ID {expense_id}: {str(e)}", exc_info=True)
-            return False
-
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                # Build SET part of the query
+                set_parts = []
+                params = []
+
+                # Process each update field
+                allowed_fields = ['date', 'amount', 'vendor', 'category', 'description', 'confidence_score']
+                for field, value in kwargs.items():
+                    if field in allowed_fields and value is not None:
+                        set_parts.append(f"{field} = %s")
+                        params.append(value)
+
+                if not set_parts:
+                    logger.warning("No valid fields provided for update")
+                    return False
+
+                # Add expense ID to parameters
+                params.append(expense_id)
+
+                # Execute update query
+                query = f"""
+                    UPDATE expenses 
+                    SET {", ".join(set_parts)}
+                    WHERE id = %s
+                """
+
+                cursor.execute(query, params)
+
+                return self._commit_if_changed(
+                    conn, cursor,
+                    f"Updated expense record with ID: {expense_id}",
+                    f"No expense found with ID: {expense_id}"
+                )
+
+    @_db_op("Error deleting expense with ID {expense_id}", fallback=False)
     def delete_expense(self, expense_id):
         """
         Delete an expense record
         Returns True if successful, False otherwise
         """
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute("DELETE FROM expenses WHERE id = %s", (expense_id,))
-
-                    if cursor.rowcount > 0:
-                        conn.commit()
-                        logger.info(f"Deleted expense record with ID: {expense_id}")
-                        return True
-                    else:
-                        logger.warning(f"No expense found with ID: {expense_id}")
-                        return False
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM expenses WHERE id = %s", (expense_id,))
 
-        except Exception as e:
-            logger.error(f"Error deleting expense with ID {expense_id}: {str(e)}", exc_info=True)
-            return False
+                return self._commit_if_changed(
+                    conn, cursor,
+                    f"Deleted expense record with ID: {expense_id}",
+                    f"No expense found with ID: {expense_id}"
+                )
 
-    def get_all_expenses_for_training(self):
-        """Get all expenses with transcription for model training"""
+    def iter_training_expenses(self):
+        """
+        Yield expenses with transcription for model training, streamed from a server-side cursor
+        A failure part-way through is logged and re-raised, so callers never train on a truncated scan
+        """
         try:
             with self._get_connection() as conn:
-                with conn.cursor() as cursor:
+                with conn.cursor(pymysql.cursors.SSDictCursor) as cursor:
                     cursor.execute("""
                         SELECT 
                             id, date, amount, vendor, category, 
@@ -483,361 +970,294 @@ class DBManager:
                         ORDER BY date
                     """)
 
-                    expenses = cursor.fetchall()
-                    return expenses
+                    while True:
+                        rows = cursor.fetchmany(TRAINING_FETCH_SIZE)
+                        if not rows:
+                            break
+                        yield from rows
 
         except Exception as e:
-            logger.error(f"Error retrieving training expenses: {str(e)}", exc_info=True)
+            logger.error(f"Error retrieving training expenses: {str(e)}",
+                         exc_info=logger.isEnabledFor(logging.DEBUG))
+            raise
+
+    def get_all_expenses_for_training(self):
+        """
+        Get all expenses with transcription for model training
+        Returns an empty list unless the whole scan succeeded (the error is logged by the iterator)
+        """
+        try:
+            return list(self.iter_training_expenses())
+        except Exception:
             return []
 
+    @_db_op("Error retrieving categories", fallback=lambda e: Config.DEFAULT_CATEGORIES)
     def get_all_categories(self):
         """Get all expense categories"""
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute("SELECT name FROM categories ORDER BY name")
-                    categories = cursor.fetchall()
-                    return [category['name'] for category in categories]
+        category_map = self._get_category_map()
+        if category_map is not None:
+            return list(category_map)
 
-        except Exception as e:
-            logger.error(f"Error retrieving categories: {str(e)}", exc_info=True)
-            return Config.DEFAULT_CATEGORIES  # Fallback to default categories
+        with self._get_connection() as conn:
+            with conn.cursor(TUPLE_CURSOR) as cursor:
+                cursor.execute("SELECT id, name FROM categories ORDER BY name")
+                return list(self._set_category_map(cursor.fetchall()))
 
+    @_db_op("Error retrieving vendors", fallback=lambda e: [])
     def get_all_vendors(self):
         """Get all unique vendor names from database"""
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute("""
-                        SELECT DISTINCT vendor
-                        FROM expenses
-                        WHERE vendor IS NOT NULL AND vendor != ''
-                        ORDER BY vendor
-                    """)
-                    vendors = cursor.fetchall()
-                    return [row['vendor'] for row in vendors]
-
-        except Exception as e:
-            logger.error(f"Error retrieving vendors: {str(e)}", exc_info=True)
-            return []
-
+        with self._get_connection() as conn:
+            with conn.cursor(TUPLE_CURSOR) as cursor:
+                cursor.execute("""
+                    SELECT DISTINCT vendor
+                    FROM expenses
+                    WHERE vendor IS NOT NULL AND vendor != ''
+                    ORDER BY vendor
+                """)
+                return [vendor for (vendor,) in cursor.fetchall()]
+
+    @_db_op("Error adding category", fallback=lambda e: (False, f"Database error: {str(e)}"))
     def add_category(self, name):
         """Add a category to the database if it doesn't exist already"""
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    # Check if exists (case-insensitive)
-                    cursor.execute(
-                        "SELECT id, name FROM categories WHERE LOWER(name) = LOWER(%s)",
-                        (name,)
-                    )
-                    existing = cursor.fetchone()
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                # Check if exists (case-insensitive)
+                cursor.execute(
+                    "SELECT id, name FROM categories WHERE LOWER(name) = LOWER(%s)",
+                    (name,)
+                )
+                existing = cursor.fetchone()
+
+                if existing:
+                    return False, f"Category '{existing['name']}' already exists"
+
+                # Add new category
+                cursor.execute(
+                    "INSERT INTO categories (name) VALUES (%s)",
+                    (name,)
+                )
 
-                    if existing:
-                        return False, f"Category '{existing['name']}' already exists"
-
-                    # Add new category
-                    cursor.execute(
-                        "INSERT INTO categories (name) VALUES (%s)",
-                        (name,)
-                    )
-
-                    conn.commit()
-                    category_id = cursor.lastrowid
-                    logger.info(f"Added new category: '{name}' with ID: {category_id}")
-                    return True, f"Successfully added category '{name}'"
-        except Exception as e:
-            logger.error(f"Error adding category: {str(e)}", exc_info=True)
-            return False, f"Database error: {str(e)}"
+                conn.commit()
+                self._invalidate_category_cache()
+                category_id = cursor.lastrowid
+                logger.info(f"Added new category: '{name}' with ID: {category_id}")
+                return True, f"Successfully added category '{name}'"
 
+    @_db_op("Error updating category", fallback=lambda e: (False, f"Database error: {str(e)}"))
     def update_category(self, category_id, new_name):
         """
         Update category name
         Returns (success: bool, message: str)
         """
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    # Check if category exists
-                    cursor.execute(
-                        "SELECT name FROM categories WHERE id = %s",
-                        (category_id,)
-                    )
-                    category = cursor.fetchone()
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                # Check if category exists
+                cursor.execute(
+                    "SELECT name FROM categories WHERE id = %s",
+                    (category_id,)
+                )
+                category = cursor.fetchone()
+
+                if not category:
+                    return False, f"Category with ID {category_id} not found"
+
+                old_name = category['name']
+
+                # Prevent renaming "Uncategorized"
+                if old_name == 'Uncategorized':
+                    return False, "Cannot rename 'Uncategorized' category"
+
+                # Check if new name already exists (case-insensitive)
+                cursor.execute(
+                    "SELECT id, name FROM categories WHERE LOWER(name) = LOWER(%s) AND id != %s",
+                    (new_name, category_id)
+                )
+                existing = cursor.fetchone()
+
+                if existing:
+                    return False, f"Category '{existing['name']}' already exists"
+
+                # Update category name
+                cursor.execute(
+                    "UPDATE categories SET name = %s WHERE id = %s",
+                    (new_name, category_id)
+                )
+
+                # Update all expenses with the new category name
+                cursor.execute(
+                    "UPDATE expenses SET category = %s WHERE category = %s",
+                    (new_name, old_name)
+                )
 
-                    if not category:
-                        return False, f"Category with ID {category_id} not found"
-
-                    old_name = category['name']
-
-                    # Prevent renaming "Uncategorized"
-                    if old_name == 'Uncategorized':
-                        return False, "Cannot rename 'Uncategorized' category"
-
-                    # Check if new name already exists (case-insensitive)
-                    cursor.execute(
-                        "SELECT id, name FROM categories WHERE LOWER(name) = LOWER(%s) AND id != %s",
-                        (new_name, category_id)
-                    )
-                    existing = cursor.fetchone()
-
-                    if existing:
-                        return False, f"Category '{existing['name']}' already exists"
-
-                    # Update category name
-                    cursor.execute(
-                        "UPDATE categories SET name = %s WHERE id = %s",
-                        (new_name, category_id)
-                    )
-
-                    # Update all expenses with the new category name
-                    cursor.execute(
-                        "UPDATE expenses SET category = %s WHERE category = %s",
-                        (new_name, old_name)
-                    )
-
-                    conn.commit()
-                    logger.info(f"Updated category from '{old_name}' to '{new_name}'")
-                    return True, f"Successfully updated category to '{new_name}'"
-
-        except Exception as e:
-            logger.error(f"Error updating category: {str(e)}", exc_info=True)
-            return False, f"Database error: {str(e)}"
+                conn.commit()
+                self._invalidate_category_cache()
+                logger.info(f"Updated category from '{old_name}' to '{new_name}'")
+                return True, f"Successfully updated category to '{new_name}'"
 
+    @_db_op("Error deleting category", fallback=lambda e: (False, f"Database error: {str(e)}", 0))
     def delete_category(self, category_id):
         """
         Delete category and move all expenses to 'Uncategorized'
         Returns (success: bool, message: str, moved_count: int)
         """
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    # Check if category exists
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                # Check if category exists
+                cursor.execute(
+                    "SELECT name FROM categories WHERE id = %s",
+                    (category_id,)
+                )
+                category = cursor.fetchone()
+
+                if not category:
+                    return False, f"Category with ID {category_id} not found", 0
+
+                category_name = category['name']
+
+                # Prevent deleting "Uncategorized"
+                if category_name == 'Uncategorized':
+                    return False, "Cannot delete 'Uncategorized' category", 0
+
+                # Count expenses in this category
+                cursor.execute(
+                    "SELECT COUNT(*) as count FROM expenses WHERE category = %s",
+                    (category_name,)
+                )
+                expense_count = cursor.fetchone()['count']
+
+                # Move all expenses to "Uncategorized"
+                if expense_count > 0:
                     cursor.execute(
-                        "SELECT name FROM categories WHERE id = %s",
-                        (category_id,)
-                    )
-                    category = cursor.fetchone()
-
-                    if not category:
-                        return False, f"Category with ID {category_id} not found", 0
-
-                    category_name = category['name']
-
-                    # Prevent deleting "Uncategorized"
-                    if category_name == 'Uncategorized':
-                        return False, "Cannot delete 'Uncategorized' category", 0
-
-                    # Count expenses in this category
-                    cursor.execute(
-                        "SELECT COUNT(*) as count FROM expenses WHERE category = %s",
+                        "UPDATE expenses SET category = 'Uncategorized' WHERE category = %s",
                         (category_name,)
                     )
-                    expense_count = cursor.fetchone()['count']
-
-                    # Move all expenses to "Uncategorized"
-                    if expense_count > 0:
-                        cursor.execute(
-                            "UPDATE expenses SET category = 'Uncategorized' WHERE category = %s",
-                            (category_name,)
-                        )
-
-                    # Delete the category
-                    cursor.execute(
-                        "DELETE FROM categories WHERE id = %s",
-                        (category_id,)
-                    )
 
-                    conn.commit()
-                    logger.info(f"Deleted category '{category_name}', moved {expense_count} expenses to 'Uncategorized'")
-                    return True, f"Successfully deleted category '{category_name}'", expense_count
+                # Delete the category
+                cursor.execute(
+                    "DELETE FROM categories WHERE id = %s",
+                    (category_id,)
+                )
 
-        except Exception as e:
-            logger.error(f"Error deleting category: {str(e)}", exc_info=True)
-            return False, f"Database error: {str(e)}", 0
+                conn.commit()
+                self._invalidate_category_cache()
+                logger.info(f"Deleted category '{category_name}', moved {expense_count} expenses to 'Uncategorized'")
+                return True, f"Successfully deleted category '{category_name}'", expense_count
 
+    @_db_op("Error getting categories with counts", fallback=lambda e: [])
     def get_categories_with_counts(self):
         """
         Get all categories with expense counts
         Returns list of dicts with category info
         """
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute("""
-                        SELECT
-                            c.id,
-                            c.name,
-                            COUNT(e.id) as expense_count
-                        FROM categories c
-                        LEFT JOIN expenses e ON c.name = e.category
-                        GROUP BY c.id, c.name
-                        ORDER BY c.name
-                    """)
-
-                    categories = cursor.fetchall()
-                    return categories
-
-        except Exception as e:
-            logger.error(f"Error getting categories with counts: {str(e)}", exc_info=True)
-            return []
-
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT
+                        c.id,
+                        c.name,
+                        COUNT(e.id) as expense_count
+                    FROM categories c
+                    LEFT JOIN expenses e ON c.name = e.category
+                    GROUP BY c.id, c.name
+                    ORDER BY c.name
+                """)
+
+                categories = cursor.fetchall()
+                return categories
+
+    @_db_op("Error adding report", reraise=True)
     def add_report(self, report_type, parameters, file_path):
         """
         Add a report record to the database
         Returns the ID of the newly created report record
         """
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute("""
-                        INSERT INTO reports 
-                        (report_type, parameters, file_path)
-                        VALUES (%s, %s, %s)
-                    """, (
-                        report_type,
-                        parameters,
-                        file_path
-                    ))
-
-                    # Get the ID of the last inserted row
-                    report_id = cursor.lastrowid
-
-                conn.commit()
-                logger.info(f"Added report record with ID: {report_id}")
-                return report_id
-
-        except Exception as e:
-            logger.error(f"Error adding report: {str(e)}", exc_info=True)
-            raise
-
-    def get_expense_data_for_report(self, categories=None, start_date=None, end_date=None, group_by='month'):
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO reports 
+                    (report_type, parameters, file_path)
+                    VALUES (%s, %s, %s)
+                """, (
+                    report_type,
+                    parameters,
+                    file_path
+                ))
+
+                # Get the ID of the last inserted row
+                report_id = cursor.lastrowid
+
+            conn.commit()
+            logger.info(f"Added report record with ID: {report_id}")
+            return report_id
+
+    @_db_op("Error retrieving report data", fallback=lambda e: {
+        'grouped': [],
+        'period_totals': [],
+        'grand_total': {'total_amount': 0, 'transaction_count': 0},
+        'detailed': []
+    })
+    def get_expense_data_for_report(self, categories=None, start_date=None, end_date=None, group_by='month',
+                                    include_detailed=False):
         """
         Get expense data for report generation with grouping options
-        Returns a list of expenses grouped by the specified period
+        Returns expenses grouped by the specified period, per-period totals and the grand total;
+        individual expenses are only fetched when include_detailed is True
         """
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    # Build WHERE clause for filtering
-                    where_clauses = []
-                    params = []
-
-                    if categories and len(categories) > 0:
-                        # Build IN clause with correct number of placeholders
-                        placeholders = ','.join(['%s'] * len(categories))
-                        where_clauses.append(f"category IN ({placeholders})")
-                        params.extend(categories)
-
-                    if start_date:
-                        where_clauses.append("date >= %s")
-                        params.append(start_date)
-
-                    if end_date:
-                        where_clauses.append("date <= %s")
-                        params.append(end_date)
-
-                    # Build WHERE clause string
-                    where_sql = ""
-                    if where_clauses:
-                        where_sql = "WHERE " + " AND ".join(where_clauses)
-
-                    # Escape all % in SQL by doubling them to avoid format string issues
-                    # Set group by expression based on period
-                    if group_by == 'day':
-                        group_expr = "DATE(date)"
-                        period_format = "DATE_FORMAT(date, '%%Y-%%m-%%d')"
-                    elif group_by == 'week':
-                        group_expr = "YEARWEEK(date, 1)"  # Mode 1: weeks start on Monday
-                        period_format = "CONCAT(YEAR(date), '-', WEEKOFYEAR(date))"
-                    elif group_by == 'month':
-                        group_expr = "DATE_FORMAT(date, '%%Y-%%m-01')"
-                        period_format = "DATE_FORMAT(date, '%%Y-%%m')"
-                    elif group_by == 'year':
-                        group_expr = "YEAR(date)"
-                        period_format = "CAST(YEAR(date) AS CHAR)"
-                    else:
-                        # Default to month
-                        group_expr = "DATE_FORMAT(date, '%%Y-%%m-01')"
-                        period_format = "DATE_FORMAT(date, '%%Y-%%m')"
-
-                    # Query for grouped data with escaped % characters
-                    query = f"""
-                        SELECT 
-                            {group_expr} AS period,
-                            {period_format} AS period_label,
-                            category,
-                            SUM(amount) AS total_amount,
-                            COUNT(*) AS transaction_count
-                        FROM expenses
-                        {where_sql}
-                        GROUP BY period, category
-                        ORDER BY period, category
-                    """
+        params = _report_params(categories, start_date, end_date)
 
-                    cursor.execute(query, params)
-                    grouped_data = cursor.fetchall()
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                # Query for grouped data; unknown groupings default to month
+                cursor.execute(SQL_REPORT_GROUPED.get(group_by, SQL_REPORT_GROUPED['month']), params)
+                grouped_data, period_totals, grand_total = _split_report_rows(cursor.fetchall())
 
+                detailed_data = []
+                if include_detailed:
                     # Query for individual expenses (for detailed reports)
-                    query = f"""
-                        SELECT 
-                            id, date, amount, vendor, category, description
-                        FROM expenses
-                        {where_sql}
-                        ORDER BY date, category
-                    """
-
-                    cursor.execute(query, params)
+                    cursor.execute(SQL_REPORT_DETAILED, params)
                     detailed_data = cursor.fetchall()
 
-                    # Convert datetime objects to strings for JSON serialization
-                    for expense in detailed_data:
-                        expense['date'] = expense['date'].isoformat()
-
-                    return {
-                        'grouped': grouped_data,
-                        'detailed': detailed_data
-                    }
-
-        except Exception as e:
-            logger.error(f"Error retrieving report data: {str(e)}", exc_info=True)
-            return {'grouped': [], 'detailed': []}
+                return {
+                    'grouped': grouped_data,
+                    'period_totals': period_totals,
+                    'grand_total': grand_total,
+                    'detailed': detailed_data
+                }
 
+    @_db_op("Error retrieving latest model metrics")
     def get_latest_model_metrics(self):
-        try:
-            with self._get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute("""
-                        SELECT
-                            id,
-                            accuracy,
-                            samples_count,
-                            categories_count,
-                            confusion_matrix,
-                            training_type,
-                            notes,
-                            timestamp
-                        FROM model_metrics
-                        ORDER BY timestamp DESC
-                        LIMIT 1
-                    """)
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT
+                        id,
+                        accuracy,
+                        samples_count,
+                        categories_count,
+                        confusion_matrix,
+                        training_type,
+                        notes,
+                        timestamp
+                    FROM model_metrics
+                    ORDER BY timestamp DESC
+                    LIMIT 1
+                """)
+
+                result = cursor.fetchone()
+                if result:
+                    # Parse JSON confusion_matrix if it's a string
+                    if result.get('confusion_matrix') and isinstance(result['confusion_matrix'], str):
+                        try:
+                            result['confusion_matrix'] = json.loads(result['confusion_matrix'])
+                        except:
+                            pass
 
-                    result = cursor.fetchone()
-                    if result:
-                        # Parse JSON confusion_matrix if it's a string
-                        if result.get('confusion_matrix') and isinstance(result['confusion_matrix'], str):
-                            try:
-                                result['confusion_matrix'] = json.loads(result['confusion_matrix'])
-                            except:
-                                pass
+                    # Convert datetime to string for serialization and rename timestamp to created_at
+                    if result.get('timestamp'):
+                        result['created_at'] = result['timestamp'].isoformat()
+                        del result['timestamp']
 
-                        # Convert datetime to string for serialization and rename timestamp to created_at
-                        if result.get('timestamp'):
-                            result['created_at'] = result['timestamp'].isoformat()
-                            del result['timestamp']
+                return result
 
-                    return result
 
-        except Exception as e:
-            logger.error(f"Error retrieving latest model metrics: {str(e)}", exc_info=True)
-            return None
\ No newline at end of file
+os.register_at_fork(after_in_child=DBManager._forget_inherited_pools)
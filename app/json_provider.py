@@ -0,0 +1,18 @@
+import orjson
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+
+class ORJSONProvider(JSONProvider):
+    """
+    jsonify/request.get_json backed by orjson
+    Output matches Flask's default provider: sorted keys, and dates, Decimals etc. go through
+    DefaultJSONProvider.default (dates stay RFC 822 strings)
+    """
+
+    option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=self.option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
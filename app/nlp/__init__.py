@@ -1,6 +1,7 @@
 import logging
 import os
 import sys
+import threading
 
 # Conditional spacy import for AlwaysData
 if not os.environ.get('DISABLE_SPACY'):
@@ -10,6 +11,7 @@ else:
 
 from app.nlp.expense_extractor import (
     extract_with_llm,
+    aextract_with_llm,
     enhance_with_llm,
     enhance_with_openai,
     parse_relative_date
@@ -29,6 +31,7 @@ from app.nlp.report_parser import (
 __all__ = [
     # Expense extraction
     'extract_with_llm',
+    'aextract_with_llm',
     'enhance_with_llm',
     'enhance_with_openai',
 
@@ -39,7 +42,10 @@ __all__ = [
 
     # Parsing report commands
     'parse_report_command',
-    'category_patterns'
+    'category_patterns',
+
+    # spaCy pipelines
+    'get_nlp'
 ]
 
 __version__ = '1.0.0'
@@ -47,30 +53,58 @@ __author__ = 'Expense Tracker Team'
 
 logger = logging.getLogger(__name__)
 
+# spaCy model per language; pipelines are loaded on first use by get_nlp, not at import
+SPACY_MODELS = {
+    'en': ('en_core_web_sm', 'English'),
+    'pl': ('pl_core_news_sm', 'Polish')
+}
+
+# Components the app never uses; tokenization and lemmatization (tagger, attribute_ruler,
+# lemmatizer) stay enabled
+SPACY_UNUSED_COMPONENTS = ('parser', 'ner')
+
+_NLP = {}
+_NLP_LOCK = threading.Lock()
+
+
+def get_nlp(lang, disable=SPACY_UNUSED_COMPONENTS):
+    """
+    Returns the spaCy pipeline for a language, loading it on first use.
+
+    Pipelines are cached per (language, disabled components). By default the parser
+    and NER are skipped; callers that only need tokens can also pass
+    disable=('tagger', 'parser', 'ner').
+    """
+    if spacy is None:
+        raise RuntimeError("spaCy is disabled (DISABLE_SPACY is set)")
+
+    key = (lang, tuple(disable))
+    if key not in _NLP:
+        with _NLP_LOCK:
+            if key not in _NLP:
+                model_name, language = SPACY_MODELS[lang]
+                _NLP[key] = spacy.load(model_name, disable=list(disable))
+                logger.info(f"spaCy {language} model ({model_name}) loaded")
+    return _NLP[key]
+
 
 def _check_spacy_models():
     """
     Checks the availability of required spaCy models.
 
     The application uses language models for both English and Polish.
-    This function verifies whether they are correctly installed.
+    This function verifies whether they are correctly installed,
+    without loading them; get_nlp loads a model when it is first needed.
     """
     if os.environ.get('DISABLE_SPACY') or spacy is None:
         logger.info("spaCy disabled - skipping model checks")
         return
 
     try:
-        required_models = [
-            ('en_core_web_sm', 'English'),
-            ('pl_core_news_sm', 'Polish')
-        ]
-
-        for model_name, language in required_models:
-            try:
-                # Attempting to load the model
-                spacy.load(model_name)
-                logger.info(f"spaCy {language} model ({model_name}) loaded successfully")
-            except OSError:
+        for model_name, language in SPACY_MODELS.values():
+            if spacy.util.is_package(model_name):
+                logger.info(f"spaCy {language} model ({model_name}) is installed")
+            else:
                 logger.warning(
                     f"spaCy {language} model ({model_name}) not found. "
                     f"Download it using: python -m spacy download {model_name}"
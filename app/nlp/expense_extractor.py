@@ -1,11 +1,14 @@
 import re
+import asyncio
 import datetime
 import logging
 import json
 import os
-from typing import List, Dict, Optional, Tuple
+import threading
+from types import MappingProxyType
+from typing import List, Dict, Optional, Set, Tuple
 
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from openai.types.chat import ChatCompletionSystemMessageParam, ChatCompletionUserMessageParam
 from dateutil.relativedelta import relativedelta
 
@@ -16,6 +19,140 @@ from app.config import Config
 # Configure logging
 logger = logging.getLogger(__name__)
 
+
+# Weekday names for "last <day>" expressions
+_DAYS_PL = {
+    'poniedziałek': 1, 'poniedzialek': 1,
+    'wtorek': 2,
+    'środa': 3, 'sroda': 3, 'środę': 3, 'srodę': 3,
+    'czwartek': 4,
+    'piątek': 5, 'piatek': 5,
+    'sobota': 6, 'sobotę': 6, 'sobote': 6,
+    'niedziela': 7, 'niedzielę': 7, 'niedziele': 7
+}
+
+_DAYS_EN = {'monday': 1, 'tuesday': 2, 'wednesday': 3, 'thursday': 4, 'friday': 5, 'saturday': 6, 'sunday': 7}
+
+_LAST_WEEKDAY_PATTERNS = [
+    (re.compile(r'(?:ostatni[ąe]?|w\s+ostatni[ąe]?)\s+(\w+)'), _DAYS_PL),
+    (re.compile(r'(?:last|on\s+last)\s+(\w+)'), _DAYS_EN)
+]
+
+# Relative date expressions per language, as offsets subtracted from today at match time
+_RELATIVE_TERMS = MappingProxyType({
+    'pl': MappingProxyType({
+        'dzisiaj': relativedelta(),
+        'dziś': relativedelta(),
+        'wczoraj': relativedelta(days=1),
+        'przedwczoraj': relativedelta(days=2),
+        'dwa dni temu': relativedelta(days=2),
+        'tydzień temu': relativedelta(days=7),
+        'miesiąc temu': relativedelta(months=1)
+    }),
+    'en': MappingProxyType({
+        'today': relativedelta(),
+        'yesterday': relativedelta(days=1),
+        'day before yesterday': relativedelta(days=2),
+        'two days ago': relativedelta(days=2),
+        'last week': relativedelta(days=7),
+        'a week ago': relativedelta(days=7),
+        'a month ago': relativedelta(months=1),
+        'last month': relativedelta(months=1)
+    })
+})
+
+# Longest first so 'day before yesterday' beats 'yesterday'
+_RELATIVE_TERM_RES = {
+    lang: re.compile('|'.join(map(re.escape, sorted(terms, key=len, reverse=True))))
+    for lang, terms in _RELATIVE_TERMS.items()
+}
+
+_MONTH_NAMES = MappingProxyType({
+    # Polish
+    'stycznia': 1, 'styczeń': 1, 'styczniu': 1, 'styczen': 1,
+    'lutego': 2, 'luty': 2, 'lutym': 2,
+    'marca': 3, 'marzec': 3, 'marcu': 3,
+    'kwietnia': 4, 'kwiecień': 4, 'kwietniu': 4, 'kwiecien': 4,
+    'maja': 5, 'maj': 5, 'maju': 5,
+    'czerwca': 6, 'czerwiec': 6, 'czerwcu': 6,
+    'lipca': 7, 'lipiec': 7, 'lipcu': 7,
+    'sierpnia': 8, 'sierpień': 8, 'sierpniu': 8, 'sierpien': 8,
+    'września': 9, 'wrzesień': 9, 'wrześniu': 9, 'wrzesien': 9, 'wrzesniu': 9,
+    'października': 10, 'październik': 10, 'październiku': 10, 'pazdziernika': 10, 'pazdziernik': 10,
+    'listopada': 11, 'listopad': 11, 'listopadzie': 11,
+    'grudnia': 12, 'grudzień': 12, 'grudniu': 12, 'grudzien': 12,
+    # English
+    'january': 1, 'jan': 1,
+    'february': 2, 'feb': 2,
+    'march': 3, 'mar': 3,
+    'april': 4, 'apr': 4,
+    'may': 5,
+    'june': 6, 'jun': 6,
+    'july': 7, 'jul': 7,
+    'august': 8, 'aug': 8,
+    'september': 9, 'sep': 9, 'sept': 9,
+    'october': 10, 'oct': 10,
+    'november': 11, 'nov': 11,
+    'december': 12, 'dec': 12
+})
+
+# Number followed by a month name; longest names first so 'marca' wins over 'mar'
+_DAY_MONTH_RE = re.compile(
+    r'(?P<day>\d+)[^\d]*?(?P<month>'
+    + '|'.join(map(re.escape, sorted(_MONTH_NAMES, key=len, reverse=True)))
+    + ')'
+)
+
+_DATE_PATTERNS = [
+    re.compile(r'(\d{4})[/\-.](\d{1,2})[/\-.](\d{1,2})'),  # YYYY-MM-DD
+    re.compile(r'(\d{1,2})[/\-.](\d{1,2})[/\-.](\d{4})'),  # DD-MM-YYYY
+]
+
+# DBManager runs schema setup on construction, so extraction shares one instance
+_db_manager: Optional[DBManager] = None
+_db_manager_lock = threading.Lock()
+
+# Created lazily inside the event loop that uses it
+_async_client: Optional[AsyncOpenAI] = None
+
+# Closing line of the system prompt for single and batched requests
+_SINGLE_RESPONSE_FORMAT = 'A JSON object of the form {"expenses": [ ... ]} only. No explanations.'
+_BATCH_RESPONSE_FORMAT = (
+    'A JSON object of the form {"results": [[ ... ], [ ... ]]} only, with one list of expenses '
+    'per numbered text, in the same order. No explanations.'
+)
+
+# Dates the model is asked to return; anything else falls back without calling strptime
+_YMD_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# Cheap gate before the OpenAI call: an amount, i.e. a number with an optional currency around it
+# ("£5", "5 funtów", "80p", "80 pence", "50 pensów", or bare "piwo 5" when Whisper drops the currency)
+_MONEY_RE = re.compile(
+    r'(?:£\s*)?\d+(?:[.,]\d+)?(?:\s*(?:£|funt\w*|pound\w*|gbp|p(?:ence|ens\w*)?)\b)?',
+    re.IGNORECASE
+)
+
+# Micro-batching of concurrent extractions: wait at most this long for more texts, and cap the batch
+EXPENSE_BATCH_WAIT = 0.2
+EXPENSE_BATCH_SIZE = 4
+
+
+def _get_db_manager() -> DBManager:
+    """Return the module's shared DBManager, creating it on first use"""
+    global _db_manager
+    if _db_manager is None:
+        with _db_manager_lock:
+            if _db_manager is None:
+                config = Config()
+                _db_manager = DBManager(
+                    host=Config.DB_HOST,
+                    user=Config.DB_USER,
+                    password=Config.DB_PASSWORD,
+                    database=config.DB_NAME
+                )
+    return _db_manager
+
+
 def extract_expenses_with_ai(text: str) -> Optional[List[Dict]]:
     """
     Main function to extract expense information from text using AI.
@@ -27,69 +164,286 @@ def extract_expenses_with_ai(text: str) -> Optional[List[Dict]]:
         List of expense dictionaries or None if extraction fails
     """
     try:
+        prepared = _prepare_extraction(text)
+        if prepared is None:
+            return None
+        db, all_categories, relative_date, now = prepared
+
         client = OpenAI(api_key=Config.OPENAI_API_KEY)
-        config = Config()
-        db = DBManager(
-            host=Config.DB_HOST,
-            user=Config.DB_USER,
-            password=Config.DB_PASSWORD,
-            database=config.DB_NAME
-        )
+        response = client.chat.completions.create(**_expense_llm_request(text, all_categories, relative_date, now))
 
-        # Check if this is a category addition command
-        is_category_command, category_name = category_service.detect_category_command(text)
-        if is_category_command and category_name:
-            logger.info(f"Detected category addition command: '{category_name}'")
+        expenses = _parse_ai_response(response.choices[0].message.content.strip())
+        if not expenses:
             return None
 
-        # Get available categories
-        all_categories = db.get_all_categories()
-        categories_str = ", ".join(all_categories)
+        return _finish_extraction(expenses, relative_date, db, now)
 
-        # Parse relative date
-        relative_date = parse_relative_date(text)
-        date_context = _build_date_context(relative_date)
+    except Exception as e:
+        logger.error(f"Error in extract_expenses_with_ai: {str(e)}", exc_info=True)
+        return None
 
-        # Build enhanced prompt with Chain of Thought
-        system_prompt = _build_system_prompt(all_categories)
-        user_prompt = _build_user_prompt(text, categories_str, date_context)
+async def aextract_expenses_with_ai(text: str) -> Optional[List[Dict]]:
+    """
+    Async variant of extract_expenses_with_ai for use inside an event loop.
 
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                ChatCompletionSystemMessageParam(role="system", content=system_prompt),
-                ChatCompletionUserMessageParam(role="user", content=user_prompt)
-            ],
-            temperature=0.1
+    The OpenAI request is awaited on AsyncOpenAI; the database and ML steps around it
+    still block, so they run in a worker thread.
+
+    Args:
+        text: Raw transcription text containing expense information
+
+    Returns:
+        List of expense dictionaries or None if extraction fails
+    """
+    try:
+        prepared = await asyncio.to_thread(_prepare_extraction, text)
+        if prepared is None:
+            return None
+        db, all_categories, relative_date, now = prepared
+
+        response = await _get_async_client().chat.completions.create(
+            **_expense_llm_request(text, all_categories, relative_date, now)
         )
 
-        # Parse response
         expenses = _parse_ai_response(response.choices[0].message.content.strip())
         if not expenses:
             return None
 
-        # Post-process and validate
-        expenses = _post_process_expenses(expenses, relative_date)
-        expenses = _validate_categorization(expenses)
+        return await asyncio.to_thread(_finish_extraction, expenses, relative_date, db, now)
 
-        # VENDOR CORRECTION - before ML categorization (so ML has correct vendor)
-        for expense in expenses:
-            if expense.get('vendor'):
-                corrected_vendor = _correct_vendor_name(expense['vendor'], db)
-                expense['vendor'] = corrected_vendor
+    except Exception as e:
+        logger.error(f"Error in aextract_expenses_with_ai: {str(e)}", exc_info=True)
+        return None
 
-        # Use ML model for category prediction if available
-        expenses = _apply_ml_categorization(expenses, db)
+def _get_async_client() -> AsyncOpenAI:
+    """Return the shared AsyncOpenAI client, creating it on first use"""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(api_key=Config.OPENAI_API_KEY)
+    return _async_client
 
-        logger.info(f"Successfully extracted {len(expenses)} expenses")
-        return expenses
+def _prepare_extraction(text: str) -> Optional[Tuple[DBManager, List[str], Optional[datetime.datetime],
+                                                     datetime.datetime]]:
+    """
+    Gather everything the LLM request needs.
 
-    except Exception as e:
-        logger.error(f"Error in extract_expenses_with_ai: {str(e)}", exc_info=True)
+    The current time is captured once here and reused for the prompt and post-processing,
+    so one extraction never sees two different "today"s.
+
+    Returns:
+        Tuple of (db_manager, categories, relative_date, now), or None for category addition commands
+        and texts without an amount
+    """
+    db = _get_db_manager()
+
+    # Check if this is a category addition command
+    is_category_command, category_name = category_service.detect_category_command(text)
+    if is_category_command and category_name:
+        logger.info(f"Detected category addition command: '{category_name}'")
+        return None
+
+    # Without an amount there is nothing for the LLM to extract
+    if Config.EXPENSE_AMOUNT_PRECHECK and not _MONEY_RE.search(text):
+        logger.info("No amount pattern in text; skipping LLM")
         return None
 
-def _build_system_prompt(categories: List[str]) -> str:
+    # Get available categories (served from DBManager's in-process cache)
+    all_categories = db.get_all_categories()
+
+    now = datetime.datetime.now()
+
+    # Parse relative date
+    relative_date = parse_relative_date(text, now=now)
+
+    return db, all_categories, relative_date, now
+
+def _expense_llm_request(text: str, categories: List[str],
+                         relative_date: Optional[datetime.datetime], now: datetime.datetime) -> Dict:
+    """
+    Build the chat completion arguments shared by the sync and async extraction paths.
+
+    Args:
+        text: Transcription to extract expenses from
+        categories: Category names the model may choose from
+        relative_date: Date parsed from the text, if any
+        now: Time the extraction started
+
+    Returns:
+        Keyword arguments for chat.completions.create
+    """
+    # Build enhanced prompt with Chain of Thought
+    system_prompt = _build_system_prompt(categories)
+    user_prompt = _build_user_prompt(text, ", ".join(categories), _build_date_context(relative_date, now))
+
+    return {
+        'model': "gpt-4o-mini",
+        'messages': [
+            ChatCompletionSystemMessageParam(role="system", content=system_prompt),
+            ChatCompletionUserMessageParam(role="user", content=user_prompt)
+        ],
+        'temperature': 0.1,
+        # JSON mode guarantees a parseable object, so no regex extraction is needed
+        'response_format': {"type": "json_object"}
+    }
+
+class ExpenseBatcher:
+    """
+    Coalesce extractions submitted within a short window into one OpenAI request.
+
+    Texts arriving within EXPENSE_BATCH_WAIT seconds of each other (up to EXPENSE_BATCH_SIZE)
+    share a numbered prompt; each caller gets its own slice of the {"results": [...]} answer.
+    A lone text, or a batch whose answer does not line up, falls back to single requests.
+    """
+
+    def __init__(self, max_batch_size: int = EXPENSE_BATCH_SIZE, max_wait: float = EXPENSE_BATCH_WAIT):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # The event loop only keeps weak references to tasks; pending dispatches are held here
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, text: str) -> Optional[List[Dict]]:
+        """
+        Extract expenses from text, sharing the OpenAI request with concurrent callers.
+
+        Args:
+            text: Raw transcription text containing expense information
+
+        Returns:
+            List of expense dictionaries or None if extraction fails
+        """
+        try:
+            prepared = await asyncio.to_thread(_prepare_extraction, text)
+            if prepared is None:
+                return None
+            db, all_categories, relative_date, now = prepared
+
+            self._ensure_worker()
+            future = asyncio.get_running_loop().create_future()
+            await self._queue.put((text, all_categories, relative_date, now, future))
+
+            expenses = await future
+            if not expenses:
+                return None
+
+            return await asyncio.to_thread(_finish_extraction, expenses, relative_date, db, now)
+
+        except Exception as e:
+            logger.error(f"Error in batched expense extraction: {str(e)}", exc_info=True)
+            return None
+
+    def _ensure_worker(self):
+        """Start the collecting task inside the running event loop"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._collect())
+
+    async def _collect(self):
+        """Group queued texts into batches and dispatch each without waiting for the previous one"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            task = loop.create_task(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch):
+        """Run one batch and resolve every caller's future, even if the batch fails or is cancelled"""
+        results = []
+        try:
+            if len(batch) == 1:
+                results = [await self._extract_single(batch[0])]
+            else:
+                results = await self._extract_batch(batch)
+        except Exception as e:
+            logger.error(f"Error in OpenAI batch of {len(batch)} texts: {str(e)}", exc_info=True)
+        finally:
+            # Callers without a result get None, so no submit() waits forever
+            for index, (*_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(results[index] if index < len(results) else None)
+
+    @staticmethod
+    async def _extract_single(item) -> Optional[List[Dict]]:
+        """One text, one request"""
+        text, categories, relative_date, now, _ = item
+        response = await _get_async_client().chat.completions.create(
+            **_expense_llm_request(text, categories, relative_date, now)
+        )
+        return _parse_ai_response(response.choices[0].message.content.strip())
+
+    async def _extract_batch(self, batch) -> List[Optional[List[Dict]]]:
+        """Several texts in one numbered prompt"""
+        # Categories only differ if one was added mid-batch; the first caller's list and time are used
+        _, categories, _, now, _ = batch[0]
+        response = await _get_async_client().chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                ChatCompletionSystemMessageParam(
+                    role="system", content=_build_system_prompt(categories, _BATCH_RESPONSE_FORMAT)
+                ),
+                ChatCompletionUserMessageParam(
+                    role="user",
+                    content=_build_batch_user_prompt(
+                        [(text, relative_date) for text, _, relative_date, _, _ in batch], ", ".join(categories), now
+                    )
+                )
+            ],
+            temperature=0.1,
+            response_format={"type": "json_object"}
+        )
+
+        try:
+            results = json.loads(response.choices[0].message.content).get('results')
+        except (json.JSONDecodeError, AttributeError):
+            results = None
+
+        if not isinstance(results, list) or len(results) != len(batch):
+            logger.warning(f"Batched extraction returned unusable results for {len(batch)} texts, retrying singly")
+            return await asyncio.gather(*(self._extract_single(item) for item in batch))
+
+        logger.info(f"Extracted expenses for {len(batch)} texts in one OpenAI request")
+        return [
+            [result] if isinstance(result, dict) else result if isinstance(result, list) else None
+            for result in results
+        ]
+
+
+# Shared by the Discord bot, which can receive several voice notes at once
+expense_batcher = ExpenseBatcher()
+
+def _finish_extraction(expenses: List[Dict], relative_date: Optional[datetime.datetime],
+                       db: DBManager, now: datetime.datetime) -> List[Dict]:
+    """Normalize, validate and ML-categorize raw expenses returned by the model"""
+    # Post-process and validate
+    expenses = _post_process_expenses(expenses, relative_date, now)
+    expenses = _validate_categorization(expenses)
+
+    # VENDOR CORRECTION - before ML categorization (so ML has correct vendor)
+    for expense in expenses:
+        if expense.get('vendor'):
+            corrected_vendor = _correct_vendor_name(expense['vendor'], db)
+            expense['vendor'] = corrected_vendor
+
+    # Use ML model for category prediction if available
+    expenses = _apply_ml_categorization(expenses, db)
+
+    logger.info(f"Successfully extracted {len(expenses)} expenses")
+    return expenses
+
+def _build_system_prompt(categories: List[str], response_format: str = _SINGLE_RESPONSE_FORMAT) -> str:
     """Build enhanced system prompt with Chain of Thought reasoning and dynamic categories"""
 
     # Category descriptions with examples
@@ -166,7 +520,7 @@ Step 1: Parse → [lightbulb, detergent, toilet paper]
 Step 2: Analyze → lightbulb=household item, detergent=cleaning product, toilet paper=hygiene
 Step 3: Categorize → lightbulb=Household Items, detergent=Cleaning Supplies, toilet paper=Hygiene Products
 
-RESPONSE FORMAT: Valid JSON array only. No explanations.
+RESPONSE FORMAT: {response_format}
 """
 
 def _build_user_prompt(text: str, categories_str: str, date_context: str) -> str:
@@ -189,30 +543,45 @@ REQUIRED JSON FIELDS:
 Apply Chain of Thought methodology. Each product gets independent analysis.
 """
 
-def _build_date_context(relative_date: Optional[datetime.datetime]) -> str:
+def _build_batch_user_prompt(items: List[Tuple[str, Optional[datetime.datetime]]], categories_str: str,
+                             now: datetime.datetime) -> str:
+    """Build one user prompt covering several numbered texts"""
+    numbered = []
+    for number, (text, relative_date) in enumerate(items, start=1):
+        numbered.append(f'{number}) "{text}"')
+        if relative_date:
+            numbered.append(f"   Relative date mentioned: {relative_date.strftime('%Y-%m-%d')}")
+
+    return f"""
+EXTRACT EXPENSES FROM EACH NUMBERED TEXT SEPARATELY:
+{chr(10).join(numbered)}
+
+Today's date: {now:%Y-%m-%d}
+
+AVAILABLE CATEGORIES: {categories_str}
+
+REQUIRED JSON FIELDS:
+- date: YYYY-MM-DD format
+- amount: numeric value (in pounds/currency mentioned)
+- vendor: store/service name
+- category: ONE from available categories
+- description: single English noun (what was bought)
+
+Apply Chain of Thought methodology. Each product gets independent analysis.
+"""
+
+def _build_date_context(relative_date: Optional[datetime.datetime], now: datetime.datetime) -> str:
     """Build date context for the prompt"""
-    context = f"Today's date: {datetime.datetime.now().strftime('%Y-%m-%d')}"
+    context = f"Today's date: {now:%Y-%m-%d}"
     if relative_date:
         context += f"\nRelative date mentioned: {relative_date.strftime('%Y-%m-%d')}"
     return context
 
 def _parse_ai_response(response_text: str) -> Optional[List[Dict]]:
-    """Parse and validate AI response"""
+    """Parse and validate AI response (a JSON object with an "expenses" list)"""
     try:
-        # Extract JSON from response
-        json_pattern = r'\[.*\]'
-        json_match = re.search(json_pattern, response_text, re.DOTALL)
-        json_str = json_match.group(0) if json_match else response_text
-
-        if not json_str.strip():
-            logger.error("Empty JSON returned from AI")
-            return None
-
-        expenses = json.loads(json_str)
-
-        # Handle string response (sometimes AI returns escaped JSON)
-        if isinstance(expenses, str):
-            expenses = json.loads(expenses)
+        data = json.loads(response_text)
+        expenses = data.get('expenses') if isinstance(data, dict) else data
 
         # Ensure we have a list
         if isinstance(expenses, dict):
@@ -228,31 +597,36 @@ def _parse_ai_response(response_text: str) -> Optional[List[Dict]]:
         logger.error(f"JSON decode error: {e}")
         return None
 
-def _post_process_expenses(expenses: List[Dict], relative_date: Optional[datetime.datetime]) -> List[Dict]:
+def _post_process_expenses(expenses: List[Dict], relative_date: Optional[datetime.datetime],
+                           now: datetime.datetime) -> List[Dict]:
     """Post-process expenses with date normalization"""
-    current_date = datetime.datetime.now()
+    current_date = now
     current_year = current_date.year
 
     for i, expense in enumerate(expenses):
-        # Process date
-        if isinstance(expense, dict) and 'date' in expense and expense['date']:
+        # Process date; the regex guard keeps malformed values away from strptime
+        date_value = expense.get('date')
+        expense_date = None
+        if isinstance(date_value, str) and _YMD_RE.match(date_value):
             try:
-                expense_date = datetime.datetime.strptime(expense['date'], '%Y-%m-%d')
-
-                # Use relative date if valid and recent
-                if relative_date and relative_date.year >= current_year:
-                    expense['date'] = relative_date
-                elif expense_date.year < current_year or expense_date > current_date:
-                    expense['date'] = current_date
-                else:
-                    expense['date'] = expense_date
-
-            except (ValueError, TypeError) as e:
+                expense_date = datetime.datetime.strptime(date_value, '%Y-%m-%d')
+            except ValueError as e:
+                # Well-formed but not a calendar date, e.g. 2025-02-30
                 logger.warning(f"Expense #{i + 1} - Date parsing error: {e}")
-                expense[
-                    'date'] = relative_date if relative_date and relative_date.year >= current_year else current_date
+        elif date_value:
+            logger.warning(f"Expense #{i + 1} - Date parsing error: unexpected date {date_value!r}")
         else:
             logger.warning(f"Expense #{i + 1} - Missing date field")
+
+        if expense_date:
+            # Use relative date if valid and recent
+            if relative_date and relative_date.year >= current_year:
+                expense['date'] = relative_date
+            elif expense_date.year < current_year or expense_date > current_date:
+                expense['date'] = current_date
+            else:
+                expense['date'] = expense_date
+        else:
             expense['date'] = relative_date if relative_date and relative_date.year >= current_year else current_date
 
         # Ensure required fields exist
@@ -461,32 +835,14 @@ def _apply_ml_categorization(expenses: List[Dict], db_manager: DBManager) -> Lis
     return expenses
 
 
-def parse_relative_date(text: str, language: str = 'pl') -> Optional[datetime.datetime]:
-    """Parse relative date expressions from text"""
-    today = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+def parse_relative_date(text: str, language: str = 'pl',
+                        now: Optional[datetime.datetime] = None) -> Optional[datetime.datetime]:
+    """Parse relative date expressions from text, relative to now (default: the current time)"""
+    today = (now or datetime.datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
     text_lower = text.lower()
 
-    # Enhanced day names mapping
-    days_pl = {
-        'poniedziałek': 1, 'poniedzialek': 1,
-        'wtorek': 2,
-        'środa': 3, 'sroda': 3, 'środę': 3, 'srodę': 3,
-        'czwartek': 4,
-        'piątek': 5, 'piatek': 5,
-        'sobota': 6, 'sobotę': 6, 'sobote': 6,
-        'niedziela': 7, 'niedzielę': 7, 'niedziele': 7
-    }
-
-    days_en = {'monday': 1, 'tuesday': 2, 'wednesday': 3, 'thursday': 4, 'friday': 5, 'saturday': 6, 'sunday': 7}
-
-    # Enhanced patterns
-    patterns = [
-        (r'(?:ostatni[ąe]?|w\s+ostatni[ąe]?)\s+(\w+)', days_pl),
-        (r'(?:last|on\s+last)\s+(\w+)', days_en)
-    ]
-
-    for pattern, day_map in patterns:
-        match = re.search(pattern, text_lower)
+    for pattern, day_map in _LAST_WEEKDAY_PATTERNS:
+        match = pattern.search(text_lower)
         if match:
             day_name = match.group(1)
             if day_name in day_map:
@@ -497,93 +853,27 @@ def parse_relative_date(text: str, language: str = 'pl') -> Optional[datetime.da
                 logger.info(f"Parsed '{day_name}' -> {target_weekday}, going back {days_back} days")
                 return today - datetime.timedelta(days=days_back)
 
-    relative_terms = {
-        'pl': {
-            'dzisiaj': today,
-            'dziś': today,
-            'wczoraj': today - datetime.timedelta(days=1),
-            'przedwczoraj': today - datetime.timedelta(days=2),
-            'dwa dni temu': today - datetime.timedelta(days=2),
-            'tydzień temu': today - datetime.timedelta(days=7),
-            'miesiąc temu': today - relativedelta(months=1)
-        },
-        'en': {
-            'today': today,
-            'yesterday': today - datetime.timedelta(days=1),
-            'day before yesterday': today - datetime.timedelta(days=2),
-            'two days ago': today - datetime.timedelta(days=2),
-            'last week': today - datetime.timedelta(days=7),
-            'a week ago': today - datetime.timedelta(days=7),
-            'a month ago': today - relativedelta(months=1),
-            'last month': today - relativedelta(months=1)
-        }
-    }
-
-    month_names = {
-        'pl': {
-            'stycznia': 1, 'styczeń': 1, 'styczniu': 1, 'styczen': 1,
-            'lutego': 2, 'luty': 2, 'lutym': 2,
-            'marca': 3, 'marzec': 3, 'marcu': 3,
-            'kwietnia': 4, 'kwiecień': 4, 'kwietniu': 4, 'kwiecien': 4,
-            'maja': 5, 'maj': 5, 'maju': 5,
-            'czerwca': 6, 'czerwiec': 6, 'czerwcu': 6,
-            'lipca': 7, 'lipiec': 7, 'lipcu': 7,
-            'sierpnia': 8, 'sierpień': 8, 'sierpniu': 8, 'sierpien': 8,
-            'września': 9, 'wrzesień': 9, 'wrześniu': 9, 'wrzesien': 9, 'wrzesniu': 9,
-            'października': 10, 'październik': 10, 'październiku': 10, 'pazdziernika': 10, 'pazdziernik': 10,
-            'listopada': 11, 'listopad': 11, 'listopadzie': 11,
-            'grudnia': 12, 'grudzień': 12, 'grudniu': 12, 'grudzien': 12
-        },
-        'en': {
-            'january': 1, 'jan': 1,
-            'february': 2, 'feb': 2,
-            'march': 3, 'mar': 3,
-            'april': 4, 'apr': 4,
-            'may': 5,
-            'june': 6, 'jun': 6,
-            'july': 7, 'jul': 7,
-            'august': 8, 'aug': 8,
-            'september': 9, 'sep': 9, 'sept': 9,
-            'october': 10, 'oct': 10,
-            'november': 11, 'nov': 11,
-            'december': 12, 'dec': 12
-        }
-    }
-
-    # Check relative terms
-    for term, date in relative_terms.get(language, {}).items():
-        if term in text_lower:
-            return date
-
-    # Check other language
+    # Check relative terms, preferred language first (one scan per language)
     other_lang = 'en' if language == 'pl' else 'pl'
-    for term, date in relative_terms.get(other_lang, {}).items():
-        if term in text_lower:
-            return date
-
-    # Check specific dates (day + month)
-    for lang, month_dict in month_names.items():
-        for month_name, month_num in month_dict.items():
-            # Pattern: number + month name
-            number_pattern = rf'(\d+)[^\d]*{month_name}'
-            number_match = re.search(number_pattern, text_lower)
-            if number_match:
-                day = int(number_match.group(1))
-                if 1 <= day <= 31:
-                    year = today.year
-                    try:
-                        return datetime.datetime(year, month_num, day)
-                    except ValueError:
-                        continue
+    for lang in (language, other_lang):
+        term_re = _RELATIVE_TERM_RES.get(lang)
+        term_match = term_re.search(text_lower) if term_re else None
+        if term_match:
+            return today - _RELATIVE_TERMS[lang][term_match.group(0)]
+
+    # Check specific dates (number + month name, one scan across all month names)
+    for number_match in _DAY_MONTH_RE.finditer(text_lower):
+        day = int(number_match.group('day'))
+        if 1 <= day <= 31:
+            year = today.year
+            try:
+                return datetime.datetime(year, _MONTH_NAMES[number_match.group('month')], day)
+            except ValueError:
+                continue
 
     # Check date formats (YYYY-MM-DD, DD-MM-YYYY)
-    date_patterns = [
-        r'(\d{4})[/\-.](\d{1,2})[/\-.](\d{1,2})',  # YYYY-MM-DD
-        r'(\d{1,2})[/\-.](\d{1,2})[/\-.](\d{4})',  # DD-MM-YYYY
-    ]
-
-    for pattern in date_patterns:
-        date_match = re.search(pattern, text)
+    for pattern in _DATE_PATTERNS:
+        date_match = pattern.search(text)
         if date_match:
             groups = date_match.groups()
             if len(groups[0]) == 4:  # YYYY-MM-DD
@@ -602,6 +892,10 @@ def extract_with_llm(text: str) -> Optional[List[Dict]]:
     """Legacy alias for extract_expenses_with_ai"""
     return extract_expenses_with_ai(text)
 
+async def aextract_with_llm(text: str) -> Optional[List[Dict]]:
+    """Async counterpart of extract_with_llm"""
+    return await aextract_expenses_with_ai(text)
+
 def enhance_with_llm(text: str, existing_expenses=None) -> Optional[List[Dict]]:
     """Legacy alias for extract_expenses_with_ai"""
     return extract_expenses_with_ai(text)
@@ -1,9 +1,85 @@
 import logging
 import re
 import datetime
+from calendar import monthrange
+from types import MappingProxyType
 
 logger = logging.getLogger(__name__)
 
+# Date range patterns, compiled once. Each is scanned on its own, since finditer matches never overlap:
+# in one alternation "between" would consume the years of "między 2023 a 2024 rok", and "2023 rok"
+# the "rok" of "2023 rok podatkowy 2023 2024". Dispatch is on m.lastgroup
+_FISCAL_YEAR_RE = re.compile(
+    r'(?P<tax>(?:rok\s+podatkowy|tax\s+year)\s+(?P<tax_start>\d{4})[\s/-]+(?P<tax_end>\d{4}))'
+    r'|(?P<accy>rok\s+obrachunkowy|accounting\s+year|fiscal\s+year)'
+)
+_LAST_N_RE = re.compile(
+    r'(?P<last_n>(?:ostatnich|ostatnie|last|past)\s+(?P<last_count>\d+)\s+'
+    r'(?P<last_unit>miesiące|miesięcy|miesiąca|months|month|lat|years|year))'
+)
+_YEAR_RE = re.compile(r'(?P<year>(?:rok|w|for|in)\s+(?P<year_after>\d{4})|(?P<year_before>\d{4})\s+rok)')
+_BETWEEN_RE = re.compile(r'(?P<between>(?:pomiędzy|między|between|from)\s+.+?\s+(?:a|i|and|to)\s+.+?\b)')
+_DATE_PATTERNS = (_FISCAL_YEAR_RE, _LAST_N_RE, _YEAR_RE, _BETWEEN_RE)
+_ANY_YEAR_RE = re.compile(r'(\d{4})')
+
+_MONTHS_PL = MappingProxyType({
+    'styczeń': 1, 'stycznia': 1, 'styczniu': 1,
+    'luty': 2, 'lutego': 2, 'lutym': 2,
+    'marzec': 3, 'marca': 3, 'marcu': 3,
+    'kwiecień': 4, 'kwietnia': 4, 'kwietniu': 4,
+    'maj': 5, 'maja': 5, 'maju': 5,
+    'czerwiec': 6, 'czerwca': 6, 'czerwcu': 6,
+    'lipiec': 7, 'lipca': 7, 'lipcu': 7,
+    'sierpień': 8, 'sierpnia': 8, 'sierpniu': 8,
+    'wrzesień': 9, 'września': 9, 'wrześniu': 9,
+    'październik': 10, 'października': 10, 'październiku': 10,
+    'listopad': 11, 'listopada': 11, 'listopadzie': 11,
+    'grudzień': 12, 'grudnia': 12, 'grudniu': 12
+})
+
+_MONTHS_EN = MappingProxyType({
+    'january': 1, 'jan': 1,
+    'february': 2, 'feb': 2,
+    'march': 3, 'mar': 3,
+    'april': 4, 'apr': 4,
+    'may': 5,
+    'june': 6, 'jun': 6,
+    'july': 7, 'jul': 7,
+    'august': 8, 'aug': 8,
+    'september': 9, 'sep': 9, 'sept': 9,
+    'october': 10, 'oct': 10,
+    'november': 11, 'nov': 11,
+    'december': 12, 'dec': 12
+})
+
+# Merged once at import; read-only so callers cannot mutate the shared tables
+_ALL_MONTHS = MappingProxyType({**_MONTHS_PL, **_MONTHS_EN})
+
+# Month names are matched as whole words, so 'summary' no longer reads as 'mar'
+_WORD_RE = re.compile(r'\w+')
+_FOUR_DIGITS_RE = re.compile(r'\d{4}')
+
+
+def _keyword_re(words):
+    """Compile a plain-substring alternation over words, longest first"""
+    return re.compile('|'.join(map(re.escape, sorted(words, key=len, reverse=True))))
+
+
+# Common words that indicate report requests
+_REPORT_INDICATOR_RE = _keyword_re([
+    'raport', 'report', 'zestawienie', 'podsumowanie', 'wyślij',
+    'wyciąg', 'summary', 'statement', 'send me', 'wszystkie', 'wydatki'
+])
+
+# Other ways of mentioning specific categories, keyed by lowercase category name
+_CATEGORY_SYNONYM_RES = {
+    'fuel': ('Fuel', _keyword_re(['benzyna', 'paliwo', 'diesel', 'gas', 'petrol', 'gasoline', 'ropa'])),
+    'groceries': ('Groceries', _keyword_re(['żywność', 'jedzenie', 'food', 'spożywcze', 'żarcie'])),
+    'utilities': ('Utilities', _keyword_re(['prąd', 'gaz', 'woda', 'media', 'electricity', 'water']))
+}
+
+_ALL_CATEGORIES_RE = _keyword_re(['all', 'wszystkie', 'całość'])
+
 def extract_date_range_from_text(text):
 
     if not text:
@@ -20,38 +96,19 @@ def extract_date_range_from_text(text):
     start_date = None
     end_date = None
 
-    # --- Year handling ---
-
-    # Check for specific year mentions
-    year_pattern = r'rok\s+(\d{4})|(\d{4})\s+rok|w\s+(\d{4})|for\s+(\d{4})|in\s+(\d{4})'
-    year_match = re.search(year_pattern, text_lower)
-
-    if year_match:
-        # Get the first non-None match group which contains the year
-        year = next((group for group in year_match.groups() if group), None)
-        if year:
-            year = int(year)
-            # Set range for the entire year
-            start_date = f"{year}-01-01"
-            end_date = f"{year}-12-31"
-            logger.info(f"Detected year range: {year} -> {start_date} to {end_date}")
+    # First match of each kind
+    matches = {}
+    for pattern in _DATE_PATTERNS:
+        for match in pattern.finditer(text_lower):
+            matches.setdefault(match.lastgroup, match)
 
     # --- Fiscal/Tax year handling ---
 
     # UK tax year: April 6 to April 5 of following year
-    uk_tax_year_pattern = r'rok\s+podatkowy\s+(\d{4})[\s/-]+(\d{4})|tax\s+year\s+(\d{4})[\s/-]+(\d{4})'
-    uk_tax_match = re.search(uk_tax_year_pattern, text_lower)
+    uk_tax_match = matches.get('tax')
 
     if uk_tax_match:
-        # Extract years from match groups
-        groups = uk_tax_match.groups()
-        if groups[0] and groups[1]:
-            start_year, end_year = int(groups[0]), int(groups[1])
-        elif groups[2] and groups[3]:  # English format
-            start_year, end_year = int(groups[2]), int(groups[3])
-        else:
-            # If no specific years provided, use current and next year
-            start_year, end_year = current_year, current_year + 1
+        start_year, end_year = int(uk_tax_match.group('tax_start')), int(uk_tax_match.group('tax_end'))
 
         # UK tax year: April 6 to April 5
         start_date = f"{start_year}-04-06"
@@ -59,10 +116,9 @@ def extract_date_range_from_text(text):
         logger.info(f"Detected UK tax year: {start_year}-{end_year} -> {start_date} to {end_date}")
 
     # UK accounting year: Any 12-month period (commonly April 1 to March 31)
-    uk_accounting_pattern = r'rok\s+obrachunkowy|accounting\s+year|fiscal\s+year'
-    if re.search(uk_accounting_pattern, text_lower) and not uk_tax_match:
+    elif 'accy' in matches:
         # If a specific year is mentioned along with accounting year
-        year_in_text = re.search(r'(\d{4})', text_lower)
+        year_in_text = _ANY_YEAR_RE.search(text_lower)
         if year_in_text:
             year = int(year_in_text.group(1))
             # Assume standard accounting year April to March
@@ -83,81 +139,54 @@ def extract_date_range_from_text(text):
 
         logger.info(f"Detected accounting year -> {start_date} to {end_date}")
 
-    # --- Month handling ---
+    # --- Year handling ---
+
+    # Specific year mentions; tax and accounting years take precedence
+    elif 'year' in matches:
+        year_match = matches['year']
+        year = int(year_match.group('year_after') or year_match.group('year_before'))
+        # Set range for the entire year
+        start_date = f"{year}-01-01"
+        end_date = f"{year}-12-31"
+        logger.info(f"Detected year range: {year} -> {start_date} to {end_date}")
 
-    # Check for specific month mentions
-    months_pl = {
-        'styczeń': 1, 'stycznia': 1, 'styczniu': 1,
-        'luty': 2, 'lutego': 2, 'lutym': 2,
-        'marzec': 3, 'marca': 3, 'marcu': 3,
-        'kwiecień': 4, 'kwietnia': 4, 'kwietniu': 4,
-        'maj': 5, 'maja': 5, 'maju': 5,
-        'czerwiec': 6, 'czerwca': 6, 'czerwcu': 6,
-        'lipiec': 7, 'lipca': 7, 'lipcu': 7,
-        'sierpień': 8, 'sierpnia': 8, 'sierpniu': 8,
-        'wrzesień': 9, 'września': 9, 'wrześniu': 9,
-        'październik': 10, 'października': 10, 'październiku': 10,
-        'listopad': 11, 'listopada': 11, 'listopadzie': 11,
-        'grudzień': 12, 'grudnia': 12, 'grudniu': 12
-    }
-
-    months_en = {
-        'january': 1, 'jan': 1,
-        'february': 2, 'feb': 2,
-        'march': 3, 'mar': 3,
-        'april': 4, 'apr': 4,
-        'may': 5,
-        'june': 6, 'jun': 6,
-        'july': 7, 'jul': 7,
-        'august': 8, 'aug': 8,
-        'september': 9, 'sep': 9, 'sept': 9,
-        'october': 10, 'oct': 10,
-        'november': 11, 'nov': 11,
-        'december': 12, 'dec': 12
-    }
+    # --- Month handling ---
 
     # If we already found a year range, don't override with month detection
     if not start_date and not end_date:
-        # Check for month mentions
-        for month_name, month_num in {**months_pl, **months_en}.items():
-            if month_name in text_lower:
-                # Check if a specific year is mentioned with this month
-                year_with_month = re.search(fr'{month_name}\s+(\d{{4}})|(\d{{4}})\s+{month_name}', text_lower)
-
-                year = current_year
-                if year_with_month:
-                    # Extract year from the match
-                    groups = year_with_month.groups()
-                    extracted_year = next((group for group in groups if group), None)
-                    if extracted_year:
-                        year = int(extracted_year)
-
-                # Set range for the specific month
-                start_date = f"{year}-{month_num:02d}-01"
-
-                # Calculate last day of month
-                if month_num == 2:  # February
-                    if (year % 4 == 0 and year % 100 != 0) or (year % 400 == 0):  # Leap year
-                        end_date = f"{year}-{month_num:02d}-29"
-                    else:
-                        end_date = f"{year}-{month_num:02d}-28"
-                elif month_num in [4, 6, 9, 11]:  # 30 days
-                    end_date = f"{year}-{month_num:02d}-30"
-                else:  # 31 days
-                    end_date = f"{year}-{month_num:02d}-31"
-
-                logger.info(f"Detected month: {month_name} {year} -> {start_date} to {end_date}")
-                break
+        # Tokenize once and look each word up in the month table
+        tokens = _WORD_RE.findall(text_lower)
+        month_name = next((token for token in tokens if token in _ALL_MONTHS), None)
+        if month_name:
+            month_num = _ALL_MONTHS[month_name]
+
+            # Check if a specific year is mentioned next to this month (any form of its name)
+            year = current_year
+            for i, token in enumerate(tokens):
+                if _ALL_MONTHS.get(token) != month_num:
+                    continue
+                neighbours = tokens[i + 1:i + 2] + tokens[max(i - 1, 0):i]
+                year_token = next((t for t in neighbours if _FOUR_DIGITS_RE.fullmatch(t)), None)
+                if year_token:
+                    year = int(year_token)
+                    break
+
+            # Set range for the specific month
+            start_date = f"{year}-{month_num:02d}-01"
+
+            # Calculate last day of month
+            end_date = f"{year}-{month_num:02d}-{monthrange(year, month_num)[1]:02d}"
+
+            logger.info(f"Detected month: {month_name} {year} -> {start_date} to {end_date}")
 
     # --- Period handling ---
 
     # Check for "last X months/years" patterns
-    last_period_pattern = r'(ostatnich|ostatnie|last|past)\s+(\d+)\s+(miesiące|miesięcy|miesiąca|months|month|lat|years|year)'
-    last_period_match = re.search(last_period_pattern, text_lower)
+    last_period_match = matches.get('last_n')
 
     if last_period_match and not start_date and not end_date:
-        number = int(last_period_match.group(2))
-        period_type = last_period_match.group(3).lower()
+        number = int(last_period_match.group('last_count'))
+        period_type = last_period_match.group('last_unit')
 
         end_date = current_date.strftime('%Y-%m-%d')
 
@@ -173,8 +202,7 @@ def extract_date_range_from_text(text):
     # --- Date range handling ---
 
     # Look for "between" or "from X to Y" patterns
-    between_pattern = r'(pomiędzy|między|between|from)\s+(.+?)\s+(a|i|and|to)\s+(.+?)\b'
-    between_match = re.search(between_pattern, text_lower)
+    between_match = matches.get('between')
 
     if between_match and not start_date:
         # This is more complex and would require date parsing logic
@@ -184,7 +212,7 @@ def extract_date_range_from_text(text):
         # This would require NLP date parsing capabilities
 
     # If no specific dates found, default to current year
-    if not start_date and not end_date and "rok" in text_lower or "year" in text_lower:
+    if not start_date and not end_date and ("rok" in text_lower or "year" in text_lower):
         start_date = f"{current_year}-01-01"
         end_date = f"{current_year}-12-31"
         logger.info(f"No specific date range found, defaulting to current year: {start_date} to {end_date}")
@@ -208,38 +236,28 @@ def extract_category_from_text(text, categories):
     # Convert text to lowercase for case-insensitive matching
     text_lower = text.lower()
 
-    # Common words that indicate report requests
-    report_indicators = [
-        'raport', 'report', 'zestawienie', 'podsumowanie', 'wyślij',
-        'wyciąg', 'summary', 'statement', 'send me', 'wszystkie', 'wydatki'
-    ]
-
-    # Check if text contains report request indicators
-    is_report_request = any(indicator in text_lower for indicator in report_indicators)
+    # Check if text contains report request indicators (one scan for all of them)
+    is_report_request = _REPORT_INDICATOR_RE.search(text_lower) is not None
 
     if not is_report_request:
         return None
 
     # Find category mentions in text
     for category in categories:
+        category_lower = category.lower()
+
         # Search for exact category name (case-insensitive)
-        if category.lower() in text_lower:
+        if category_lower in text_lower:
             return category
 
         # Additional handling for specific categories that might be mentioned differently
-        if category.lower() == 'fuel' and any(
-                word in text_lower for word in ['benzyna', 'paliwo', 'diesel', 'gas', 'petrol', 'gasoline', 'ropa']):
-            return 'Fuel'
-        elif category.lower() == 'groceries' and any(
-                word in text_lower for word in ['żywność', 'jedzenie', 'food', 'spożywcze', 'żarcie']):
-            return 'Groceries'
-        elif category.lower() == 'utilities' and any(
-                word in text_lower for word in ['prąd', 'gaz', 'woda', 'media', 'electricity', 'water']):
-            return 'Utilities'
+        synonyms = _CATEGORY_SYNONYM_RES.get(category_lower)
+        if synonyms and synonyms[1].search(text_lower):
+            return synonyms[0]
 
     # If text is a report request but no specific category was found,
     # check if "all" or "wszystkie" is mentioned, implying a full report
-    if any(word in text_lower for word in ['all', 'wszystkie', 'całość']):
+    if _ALL_CATEGORIES_RE.search(text_lower):
         # Return None for all categories report
         return None
 
@@ -10,7 +10,12 @@ from app.services.email_service import (
     send_category_confirmation_notification,
     try_generate_report_from_text
 )
-from app.services.transcription import transcribe_audio, convert_audio_to_wav
+from app.services.transcription import (
+    transcribe_audio,
+    transcribe_audio_async,
+    convert_audio_to_wav,
+    convert_audio_bytes_to_wav
+)
 
 
 # Export the functions that should be accessible at the package level
@@ -32,7 +37,9 @@ __all__ = [
 
     # Transcription
     'transcribe_audio',
+    'transcribe_audio_async',
     'convert_audio_to_wav',
+    'convert_audio_bytes_to_wav',
 
     # Discord
     'run_discord_bot'
@@ -1,8 +1,14 @@
 import re
+import time
+import string
+import difflib
 import logging
+import functools
+import threading
 from typing import List, Dict, Optional, Tuple
 
-from openai import OpenAI
+from cachetools import TTLCache
+from openai import APIConnectionError, APITimeoutError, OpenAI, RateLimitError
 from openai.types.chat import ChatCompletionSystemMessageParam, ChatCompletionUserMessageParam
 
 from app.config import Config
@@ -10,6 +16,132 @@ from app.database.db_manager import DBManager
 
 logger = logging.getLogger(__name__)
 
+# Single pass over the command: add keyword, category keyword, separator, then the name payload
+_CMD_RE = re.compile(
+    r'(?:dodaj|nowa|nową|utwórz|add|new|create)\b[^:\-–—]*?'
+    r'(?:kategori[ęea]?|category)\s*[:\-–—\s]\s*(?:(?:jako|as)\s+)?'
+    r'(?P<name>[^.,:;!?]+)',
+    re.IGNORECASE
+)
+
+# Exact-word keyword sets used to strip command words from the extracted name
+_CATEGORY_KW = frozenset({'kategori', 'kategoria', 'kategorie', 'kategorię', 'kategorii', 'category'})
+_ADD_KW = frozenset({'dodaj', 'nowa', 'nową', 'utwórz', 'add', 'new', 'create'})
+_ALL_KW = _CATEGORY_KW | _ADD_KW
+_TRAILING_PUNCT_RE = re.compile(r'[.,:;!?]+$')
+_SEPARATOR_SPLIT_RE = re.compile(r'[:\-–—]\s*')
+
+# Letters (including Polish), digits, whitespace, hyphen, underscore, apostrophe and dot
+_VALID_CATEGORY_RE = re.compile(r"^[\w\s\-'.]+$")
+
+_TRANSLATE_SYSTEM_PROMPT = "Translate expense category to English. Output only the Title-Cased English name."
+
+# Retries for 429 responses; these back off and never count toward the fallback path
+_RATE_LIMIT_RETRIES = 3
+_RATE_LIMIT_BASE_DELAY = 1.0
+
+# Per-request timeout and attempts for single-name translations before falling back
+_TRANSLATION_TIMEOUT = 2.0
+_TRANSLATION_ATTEMPTS = 2
+
+# The client is built without the SDK's own retries, so the retries above are the only ones
+_SDK_MAX_RETRIES = 0
+
+
+class _Throttle:
+    """Leaky-bucket limiter for OpenAI requests-per-minute and tokens-per-minute"""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.max_requests_per_minute = requests_per_minute
+        self.max_tokens_per_minute = tokens_per_minute
+        self.available_request_capacity = float(requests_per_minute)
+        self.available_token_capacity = float(tokens_per_minute)
+        self._last_update = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens_estimate: int) -> float:
+        """Take capacity if available, otherwise return seconds to wait before retrying"""
+        tokens_estimate = min(tokens_estimate, self.max_tokens_per_minute)
+
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._last_update
+            self._last_update = now
+
+            self.available_request_capacity = min(
+                self.available_request_capacity + self.max_requests_per_minute * elapsed / 60.0,
+                self.max_requests_per_minute
+            )
+            self.available_token_capacity = min(
+                self.available_token_capacity + self.max_tokens_per_minute * elapsed / 60.0,
+                self.max_tokens_per_minute
+            )
+
+            if self.available_request_capacity >= 1 and self.available_token_capacity >= tokens_estimate:
+                self.available_request_capacity -= 1
+                self.available_token_capacity -= tokens_estimate
+                return 0.0
+
+            request_wait = (1 - self.available_request_capacity) * 60.0 / self.max_requests_per_minute
+            token_wait = (tokens_estimate - self.available_token_capacity) * 60.0 / self.max_tokens_per_minute
+            return max(request_wait, token_wait, 0.0)
+
+    def acquire(self, tokens_estimate: int):
+        """Block until a request with the given token estimate fits in the budget"""
+        while (wait := self._reserve(tokens_estimate)) > 0:
+            time.sleep(wait)
+
+
+_throttle = _Throttle(Config.OPENAI_RPM_LIMIT, Config.OPENAI_TPM_LIMIT)
+
+
+# Existing category names shared across service instances, refreshed every _CATEGORY_CACHE_TTL seconds
+_CATEGORY_CACHE_TTL = 60
+_category_cache = {'ts': 0.0, 'names': [], 'lower_map': {}}
+
+# Memoized detect_category_command results; texts longer than this are not cached. Entries expire
+# with the category list they were matched against, and TTLCache is not thread-safe on its own
+_DETECT_CACHE_SIZE = 1024
+_DETECT_CACHE_MAX_TEXT = 4096
+_detect_cache = TTLCache(maxsize=_DETECT_CACHE_SIZE, ttl=_CATEGORY_CACHE_TTL)
+_detect_cache_lock = threading.Lock()
+
+
+def _estimate_tokens(*texts: str) -> int:
+    """Rough prompt+completion token estimate used for throttling"""
+    return sum(len(text) for text in texts) // 4 + 80
+
+
+def _translation_complete(parts: List[str]) -> bool:
+    """Streamed translation is usable once a newline appears or more than three words arrived"""
+    text = "".join(parts)
+    return "\n" in text or len(text.split()) > 3
+
+
+def _first_line(text: str) -> str:
+    """First line of streamed output, capped at three words"""
+    return " ".join(text.split("\n", 1)[0].split()[:3])
+
+
+def _with_translation_fallback(func):
+    """
+    Retry a single-name translation once on timeout/connection errors,
+    then fall back to the normalized name on any failure
+    """
+    @functools.wraps(func)
+    def wrapper(self, category_name: str) -> str:
+        for attempt in range(1, _TRANSLATION_ATTEMPTS + 1):
+            try:
+                return func(self, category_name)
+            except (APITimeoutError, APIConnectionError) as e:
+                if attempt == _TRANSLATION_ATTEMPTS:
+                    return self._fallback_translation(category_name, e)
+                logger.warning(f"Translation attempt {attempt} failed: {str(e)}, retrying")
+            except Exception as e:
+                return self._fallback_translation(category_name, e)
+
+    return wrapper
+
 
 class CategoryServiceError(Exception):
     """Custom exception for category service errors"""
@@ -21,8 +153,11 @@ class CategoryService:
 
     def __init__(self, db_manager: DBManager, openai_client: Optional[OpenAI] = None):
         self.db_manager = db_manager
-        self.openai_client = openai_client or OpenAI(api_key=Config.OPENAI_API_KEY)
+        self.openai_client = openai_client or OpenAI(api_key=Config.OPENAI_API_KEY,
+                                                      max_retries=_SDK_MAX_RETRIES)
         self._categories_cache: Optional[List[str]] = None
+        # Set once a translation had to fall back, so its result is not memoized
+        self._translation_failed = False
 
     def get_all_categories(self, use_cache: bool = True) -> List[str]:
         """
@@ -60,19 +195,19 @@ class CategoryService:
             CategoryServiceError: If validation fails
         """
         try:
-            # Input validation
-            if not name or not name.strip():
+            # Validate raw input before any normalization work
+            stripped_name = name.strip() if name else ""
+            if not stripped_name:
                 return {"success": False, "message": "Category name cannot be empty"}
 
-            # Normalize and validate
-            normalized_name = self._normalize_category_name(name)
-            if len(normalized_name) > 50:
+            if len(stripped_name) > 50:
                 return {"success": False, "message": "Category name too long (max 50 characters)"}
 
-            # Check for invalid characters
-            if not re.match(r'^[a-zA-Z0-9\s\-_]+$', normalized_name):
+            if not _VALID_CATEGORY_RE.match(stripped_name):
                 return {"success": False, "message": "Category name contains invalid characters"}
 
+            normalized_name = self._normalize_category_name(stripped_name)
+
             # Translate to English if needed
             english_name = self._translate_category_with_llm(normalized_name)
 
@@ -81,7 +216,7 @@ class CategoryService:
 
             # Clear cache on successful addition
             if success:
-                self._categories_cache = None
+                self.clear_cache()
 
             return {"success": success, "message": message}
 
@@ -166,105 +301,70 @@ class CategoryService:
         if not text or not text.strip():
             return False, None
 
-        logger.debug(f"Analyzing text for category command: '{text}'")
-        text_lower = text.lower().strip()
-
-        # Enhanced keyword detection
-        category_keywords = ['kategori', 'category', 'kategorię']
-        add_keywords = ['dodaj', 'nowa', 'nową', 'utwórz', 'add', 'new', 'create']
+        logger.debug("Analyzing text for category command: '%s'", text)
 
-        has_category = any(keyword in text_lower for keyword in category_keywords)
-        has_add = any(keyword in text_lower for keyword in add_keywords)
+        # Extract category name
+        category_name = self._extract_category_name_from_command(text)
 
-        if has_category and has_add:
-            logger.debug(f"Category command keywords detected in: '{text}'")
+        if category_name:
+            logger.debug("Category command keywords detected in: '%s'", text)
 
-            # Extract category name
-            category_name = self._extract_category_name_from_command(text)
+            # Validate extracted name
+            if len(category_name) > 50:
+                logger.warning(f"Category name too long: '{category_name}'")
+                return False, None
 
-            if category_name:
-                # Validate extracted name
-                if len(category_name) > 50:
-                    logger.warning(f"Category name too long: '{category_name}'")
-                    return False, None
+            # Translate to English
+            try:
+                translated_name = self._translate_category_with_llm(category_name)
+                logger.info(f"Detected category command: '{text}' -> '{translated_name}'")
+                return True, translated_name
+            except Exception as e:
+                logger.error(f"Translation failed for category command: {e}")
+                self._translation_failed = True
+                return False, None
 
-                # Translate to English
-                try:
-                    translated_name = self._translate_category_with_llm(category_name)
-                    logger.info(f"Detected category command: '{text}' -> '{translated_name}'")
-                    return True, translated_name
-                except Exception as e:
-                    logger.error(f"Translation failed for category command: {e}")
-                    return False, None
-
-        logger.debug(f"No category command detected in: '{text}'")
+        logger.debug("No category command detected in: '%s'", text)
         return False, None
 
     def clear_cache(self):
         """Clear categories cache"""
         self._categories_cache = None
+        _category_cache['ts'] = 0.0
         logger.debug("Categories cache cleared")
 
     def _extract_category_name_from_command(self, text: str) -> Optional[str]:
         """Extract category name from command text with improved parsing"""
-        # Try multiple separators
-        separators = [':', '-', '–', '—', ' jako ', ' as ']
-
-        for separator in separators:
-            if separator in text:
-                parts = text.split(separator, 1)
-                if len(parts) > 1 and parts[1].strip():
-                    candidate = parts[1].strip()
-                    cleaned = self._clean_category_name(candidate)
-                    if cleaned:
-                        return cleaned
-
-        # Fallback: pattern matching for "dodaj kategorię X" or "add category X"
-        patterns = [
-            r'(?:dodaj|add)\s+(?:kategori[ęe]|category)\s+([a-zA-Z0-9\s\-_]+)',
-            r'(?:nowa|new)\s+(?:kategori[ęe]|category)\s+([a-zA-Z0-9\s\-_]+)',
-            r'(?:kategori[ęe]|category)\s+([a-zA-Z0-9\s\-_]+)'
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                candidate = match.group(1).strip()
-                cleaned = self._clean_category_name(candidate)
-                if cleaned:
-                    return cleaned
+        match = _CMD_RE.search(text)
+        if not match:
+            return None
 
-        return None
+        # An explicit separator after the command wins, e.g. "dodaj kategorię dla kota: Zwierzęta"
+        parts = _SEPARATOR_SPLIT_RE.split(text[match.start():], maxsplit=1)
+        if len(parts) > 1 and parts[1].strip():
+            cleaned = self._clean_category_name(parts[1].strip())
+            if cleaned:
+                return cleaned
+
+        candidate = match.group('name').strip()
+        return self._clean_category_name(candidate) or None
 
     def _clean_category_name(self, name: str) -> str:
         """Clean and validate category name"""
-        # Remove category keywords and punctuation
-        name = re.sub(r'kategori[ęea]?\s*', '', name, flags=re.IGNORECASE)
-        name = re.sub(r'category\s*', '', name, flags=re.IGNORECASE)
-        name = re.sub(r'[.,:;!?]+$', '', name)
-
-        # Remove command keywords
-        command_words = ['dodaj', 'add', 'new', 'nowa', 'nową', 'create', 'utwórz']
-        for word in command_words:
-            name = re.sub(rf'\b{word}\b', '', name, flags=re.IGNORECASE)
-
-        # Clean whitespace
-        name = ' '.join(name.split())
-
-        return name.strip()
+        # Remove trailing punctuation, then drop category and command keywords word by word
+        name = _TRAILING_PUNCT_RE.sub('', name)
+        return ' '.join(word for word in name.split() if word.lower() not in _ALL_KW)
 
     def _normalize_category_name(self, name: str) -> str:
         """Normalize category name for consistency"""
         if not name or not name.strip():
             return ""
 
-        # Clean and normalize
-        normalized = name.strip()
-        # Capitalize first letter of each wordtak
-        normalized = " ".join(word.capitalize() for word in normalized.split())
-
-        return normalized
+        # Collapse whitespace and capitalize first letter of each word
+        # (not str.title(), which also capitalizes after apostrophes: "Kid'S Toys")
+        return string.capwords(name)
 
+    @_with_translation_fallback
     def _translate_category_with_llm(self, category_name: str) -> str:
         """
         Translate category name to English using OpenAI with error handling
@@ -278,58 +378,105 @@ class CategoryService:
         Raises:
             CategoryServiceError: If translation fails
         """
+        existing_name = self._match_existing_category(category_name)
+        if existing_name:
+            return existing_name
+
+        response = self._create_completion(
+            _estimate_tokens(category_name),
+            model="gpt-4o-mini",
+            messages=[
+                ChatCompletionSystemMessageParam(role="system", content=_TRANSLATE_SYSTEM_PROMPT),
+                ChatCompletionUserMessageParam(role="user", content=category_name)
+            ],
+            temperature=0.1,
+            max_tokens=10,
+            stream=True,
+            timeout=_TRANSLATION_TIMEOUT
+        )
+
+        parts = []
         try:
-            system_prompt = """
-            You are a financial category translator. Translate expense category names to English.
-            Rules:
-            - Output ONLY the translated category name
-            - Capitalize first letter of each word
-            - Keep it concise (1-3 words max)
-            - Use common expense category terms
-
-            Common translations:
-            - żywność/jedzenie -> Groceries
-            - transport -> Transportation  
-            - rozrywka -> Entertainment
-            - odzież -> Clothing
-            """
-
-            user_prompt = f"Translate to English: '{category_name}'"
-
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    ChatCompletionSystemMessageParam(role="system", content=system_prompt),
-                    ChatCompletionUserMessageParam(role="user", content=user_prompt)
-                ],
-                temperature=0.1,
-                max_tokens=15
-            )
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    if _translation_complete(parts):
+                        break
+        finally:
+            response.close()
+
+        return self._validate_translation(category_name, _first_line("".join(parts)))
+
+    def _match_existing_category(self, category_name: str) -> Optional[str]:
+        """Return the stored name of a close existing category, refreshing the shared cache on TTL expiry"""
+        now = time.monotonic()
+        if now - _category_cache['ts'] > _CATEGORY_CACHE_TTL:
+            names = self.db_manager.get_all_categories()
+            _category_cache['names'] = names
+            _category_cache['lower_map'] = {name.lower(): name for name in names}
+            _category_cache['ts'] = now
+
+        matches = difflib.get_close_matches(
+            category_name.lower(), _category_cache['lower_map'].keys(), n=1, cutoff=0.85
+        )
+        if matches:
+            existing_name = _category_cache['lower_map'][matches[0]]
+            logger.info(f"Matched '{category_name}' to existing category '{existing_name}'")
+            return existing_name
 
-            translated_name = response.choices[0].message.content.strip()
+        return None
 
-            # Validate translation result
-            if not translated_name or len(translated_name) > 50:
-                raise CategoryServiceError("Invalid translation result")
+    def _create_completion(self, tokens_estimate: int, **kwargs):
+        """Throttled chat completion that backs off on rate limits before giving up"""
+        for attempt in range(_RATE_LIMIT_RETRIES):
+            _throttle.acquire(tokens_estimate)
+            try:
+                return self.openai_client.chat.completions.create(**kwargs)
+            except RateLimitError:
+                delay = _RATE_LIMIT_BASE_DELAY * 2 ** attempt
+                logger.warning(f"OpenAI rate limit hit, retrying in {delay:.1f}s")
+                time.sleep(delay)
 
-            logger.info(f"LLM translated '{category_name}' to '{translated_name}'")
-            return translated_name
+        _throttle.acquire(tokens_estimate)
+        return self.openai_client.chat.completions.create(**kwargs)
 
-        except Exception as e:
-            logger.error(f"Translation error: {str(e)}", exc_info=True)
-            # Smart fallback - normalize original
-            fallback = self._normalize_category_name(category_name)
-            logger.warning(f"Using fallback translation: '{fallback}'")
+    def _validate_translation(self, category_name: str, content: Optional[str]) -> str:
+        """Validate raw LLM output for a single category translation"""
+        translated_name = (content or "").strip()
+
+        if not translated_name or len(translated_name) > 50:
+            raise CategoryServiceError("Invalid translation result")
+
+        logger.info(f"LLM translated '{category_name}' to '{translated_name}'")
+        return translated_name
 
-            if not fallback:
-                raise CategoryServiceError("Translation failed and no valid fallback") from e
+    def _fallback_translation(self, category_name: str, error: Exception) -> str:
+        """Smart fallback - normalize original name when translation fails"""
+        self._translation_failed = True
+        logger.error(f"Translation error: {str(error)}", exc_info=error)
+        fallback = self._normalize_category_name(category_name)
+        logger.warning(f"Using fallback translation: '{fallback}'")
 
-            return fallback
+        if not fallback:
+            raise CategoryServiceError("Translation failed and no valid fallback") from error
+
+        return fallback
 
 
 # Legacy functions for backward compatibility
 def detect_category_command(text: str) -> Tuple[bool, Optional[str]]:
-    """Legacy function for backward compatibility"""
+    """
+    Legacy function for backward compatibility
+    The Discord bot and the expense extractor both check the same transcription,
+    so results are memoized per text; very long texts and failed translations are not cached
+    """
+    cacheable = bool(text) and len(text) <= _DETECT_CACHE_MAX_TEXT
+    if cacheable:
+        with _detect_cache_lock:
+            cached = _detect_cache.get(text)
+        if cached is not None:
+            return cached
+
     config = Config()
     db_manager = DBManager(
         host=Config.DB_HOST,
@@ -339,7 +486,12 @@ def detect_category_command(text: str) -> Tuple[bool, Optional[str]]:
     )
 
     service = CategoryService(db_manager)
-    return service.detect_category_command(text)
+    result = service.detect_category_command(text)
+
+    if cacheable and not service._translation_failed:
+        with _detect_cache_lock:
+            _detect_cache[text] = result
+    return result
 
 
 def translate_category_with_llm(category_name: str) -> str:
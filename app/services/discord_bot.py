@@ -1,5 +1,6 @@
 import os
-import tempfile
+import asyncio
+import functools
 import datetime
 import logging
 
@@ -15,8 +16,8 @@ else:
 
 from app.services import category_service
 from app.config import Config
-from app.services.transcription import transcribe_audio
-from app.nlp.expense_extractor import extract_with_llm
+from app.services.transcription import transcribe_audio_async
+from app.nlp.expense_extractor import expense_batcher
 from app.database.db_manager import DBManager
 from app.services.email_service import send_category_addition_email, try_generate_report_from_text
 from app.services.email_templates import EmailTemplates
@@ -24,9 +25,18 @@ from concurrent.futures import ThreadPoolExecutor
 
 # Bot configuration
 if discord and commands:
+    class ExpenseBot(commands.Bot):
+        """Bot that closes the shared download session when it shuts down"""
+
+        async def close(self):
+            # Not in on_disconnect: that also fires on every gateway reconnect
+            if _http_session is not None and not _http_session.closed:
+                await _http_session.close()
+            await super().close()
+
     intents = discord.Intents.default()
     intents.message_content = True
-    bot = commands.Bot(command_prefix='!', intents=intents)
+    bot = ExpenseBot(command_prefix='!', intents=intents)
 else:
     bot = None
     intents = None
@@ -34,16 +44,41 @@ else:
 # Get logger instance
 logger = logging.getLogger(__name__)
 email_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="email_worker")
+# Transcription, LLM and database calls block on network I/O, so a few concurrent voice notes fit in one pool
+audio_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="audio_worker")
 sent_confirmations = set()
 
 # Sets for deduplication
 processed_messages = set()
 processed_audio = set()
 
+# Bytes read per chunk when streaming an attachment to disk
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Shared HTTP session for attachment downloads (keep-alive connections to the Discord CDN)
+_http_session = None
+
+
+def _get_http_session():
+    """Return the shared aiohttp session, creating it on first use or after it was closed"""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, limit_per_host=20, keepalive_timeout=30)
+        )
+    return _http_session
+
+
+async def _run_blocking(executor, func, *args, **kwargs):
+    """Run a blocking call in the given thread pool so the event loop keeps serving other messages"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
 
 if bot:
     @bot.event
     async def on_ready():
+        _get_http_session()
         print(f'Bot logged in as {bot.user}')
 
 
@@ -69,10 +104,14 @@ if bot:
         if len(sent_confirmations) > 50:
             sent_confirmations.clear()
 
-        for attachment in message.attachments:
-            if any(attachment.filename.lower().endswith(ext) for ext in ['.mp3', '.wav', '.ogg', '.m4a']):
-                await process_discord_audio(message, attachment)
-                return
+        # Several voice clips in one message are transcribed concurrently
+        audio_attachments = [
+            attachment for attachment in message.attachments
+            if any(attachment.filename.lower().endswith(ext) for ext in ['.mp3', '.wav', '.ogg', '.m4a'])
+        ]
+        if audio_attachments:
+            await asyncio.gather(*(process_discord_audio(message, attachment) for attachment in audio_attachments))
+            return
 
         await bot.process_commands(message)
 
@@ -91,39 +130,44 @@ async def process_discord_audio(message, attachment):
 
     try:
         config = Config()
-        db_manager = DBManager(
+        db_manager = await _run_blocking(
+            audio_executor,
+            DBManager,
             host=Config.DB_HOST,
             user=Config.DB_USER,
             password=Config.DB_PASSWORD,
             database=config.DB_NAME
         )
 
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(attachment.filename)[1])
-        temp_file.close()
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(attachment.url) as resp:
+        # Download inside the try so failures are reported like any other processing error
+        try:
+            async with _get_http_session().get(attachment.url) as resp:
                 if resp.status == 200:
-                    with open(temp_file.name, 'wb') as f:
-                        f.write(await resp.read())
+                    # Keep the audio in memory; it goes straight to Whisper without a temp file
+                    audio = bytearray()
+                    async for chunk in resp.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        audio += chunk
                 else:
                     await message.channel.send(f"Failed to download audio file. Error code: {resp.status}")
                     return
 
-        try:
-            transcription = transcribe_audio(temp_file.name)
+            transcription = await transcribe_audio_async(bytes(audio), filename=attachment.filename)
             logger.info(f"Discord transcription: {transcription}")
 
             # Check if this is a category addition command
-            is_category_command, category_name = category_service.detect_category_command(transcription)
+            is_category_command, category_name = await _run_blocking(
+                audio_executor, category_service.detect_category_command, transcription
+            )
 
             if is_category_command and category_name:
                 # Process category addition command
                 logger.info(f"Processing category addition command for: {category_name}")
-                success, result_message = db_manager.add_category(category_name)
+                success, result_message = await _run_blocking(audio_executor, db_manager.add_category, category_name)
 
                 # Send email notification about category action
-                email_success = send_category_addition_email(category_name, success, result_message)
+                email_success = await _run_blocking(
+                    email_executor, send_category_addition_email, category_name, success, result_message
+                )
                 if not email_success:
                     logger.warning(f"Failed to send category addition email for: {category_name}")
 
@@ -144,14 +188,15 @@ async def process_discord_audio(message, attachment):
 
             # If this is a report request
             if "report" in transcription.lower() or "raport" in transcription.lower():
-                report_generated = try_generate_report_from_text(transcription)
+                report_generated = await _run_blocking(audio_executor, try_generate_report_from_text, transcription)
                 if report_generated:
                     sent_confirmations.add(request_id)
                     await message.channel.send("📧 Report has been sent to your email.")
                     return
 
             # If not a category command or report request, try to extract expenses
-            expenses = extract_with_llm(transcription)
+            # Shares one OpenAI request with voice notes arriving at the same time
+            expenses = await expense_batcher.submit(transcription)
             logger.info(f"Discord extracted expenses: {expenses}")
 
             if not expenses:
@@ -171,32 +216,30 @@ async def process_discord_audio(message, attachment):
             sent_confirmations.add(response_id)
             logger.info(f"Added response_id to sent_confirmations: {response_id}")
 
-            # Add expenses to database
-            expense_ids = []
-            for expense in expenses:
-                expense_id = db_manager.add_expense(
-                    date=expense.get('date', datetime.datetime.now()),
-                    amount=expense.get('amount'),
-                    vendor=expense.get('vendor', ''),
-                    category=expense.get('category', ''),
-                    description=expense.get('description', ''),
-                    audio_file_path=temp_file.name,
-                    transcription=transcription,
-                    confidence_score=expense.get('confidence_score', 0.0)
-                )
-                if expense_id:
-                    expense_ids.append(expense_id)
+            # Add expenses to database in one transaction; duplicates come back as 0
+            saved_ids = await _run_blocking(audio_executor, db_manager.add_expenses, [
+                {
+                    'date': expense.get('date', datetime.datetime.now()),
+                    'amount': expense.get('amount'),
+                    'vendor': expense.get('vendor', ''),
+                    'category': expense.get('category', ''),
+                    'description': expense.get('description', ''),
+                    # Nothing is written to disk; record where the audio came from
+                    'audio_file_path': attachment.filename,
+                    'transcription': transcription,
+                    'confidence_score': expense.get('confidence_score', 0.0)
+                }
+                for expense in expenses
+            ])
+            expense_ids = [expense_id for expense_id in saved_ids if expense_id]
 
             # Build Discord response message
-            response = "✅ Recognized expenses:\n"
+            lines = ["✅ Recognized expenses:"]
             for expense in expenses:
-                expense_date = expense.get('date')
-                if isinstance(expense_date, datetime.datetime):
-                    date_str = expense_date.strftime('%Y-%m-%d')
-                else:
-                    date_str = str(expense_date).split('T')[0] if 'T' in str(expense_date) else str(expense_date)
-
-                response += f"- {date_str}: {expense.get('vendor', 'Unknown store')} - £{expense.get('amount', 0)} ({expense.get('category', 'Other category')})\n"
+                # Extraction normalizes every expense date to a datetime
+                date_str = expense['date'].strftime('%Y-%m-%d')
+                lines.append(f"- {date_str}: {expense.get('vendor', 'Unknown store')} - £{expense.get('amount', 0)} ({expense.get('category', 'Other category')})")
+            response = "\n".join(lines)
 
             # Send Discord message
             logger.info(f"Sending Discord response for message {message.id}: {len(expenses)} expenses")
@@ -217,7 +260,9 @@ async def process_discord_audio(message, attachment):
 
                         # Send via email_service.send_email
                         from app.services.email_service import send_email
-                        send_email(
+                        await _run_blocking(
+                            email_executor,
+                            send_email,
                             recipient=Config.DEFAULT_EMAIL_RECIPIENT,
                             subject=subject,
                             body=html
@@ -234,11 +279,6 @@ async def process_discord_audio(message, attachment):
             logger.error(f"Error processing audio in Discord bot: {str(e)}", exc_info=True)
             await message.channel.send(f"❌ An error occurred while processing audio: {str(e)}")
 
-        finally:
-            try:
-                os.unlink(temp_file.name)
-            except:
-                pass
 
     except Exception as e:
         logger.error(f"Error in Discord bot: {str(e)}", exc_info=True)
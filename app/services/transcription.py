@@ -1,40 +1,70 @@
+import io
+import asyncio
+import hashlib
 import logging
 import os
 import subprocess
 import tempfile
+import threading
 
-from openai import OpenAI
+from cachetools import LRUCache
+from openai import AsyncOpenAI, OpenAI
 
+from app import ensure_directory
 from app.config import Config
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# In-process layer over the on-disk transcription cache
+TRANSCRIPTION_MEMORY_CACHE_SIZE = 1024
+_transcription_cache = LRUCache(maxsize=TRANSCRIPTION_MEMORY_CACHE_SIZE)
+_transcription_cache_lock = threading.Lock()
 
-def convert_audio_to_wav(input_file):
-    """Convert audio file to WAV format for better compatibility with Whisper"""
-    try:
-        base_name = os.path.splitext(os.path.basename(input_file))[0]
-        output_file = os.path.join(tempfile.gettempdir(), f"{base_name}.wav")
+# Whisper requests in flight at once from transcribe_audio_async
+TRANSCRIPTION_CONCURRENCY = 8
+_transcription_semaphore = asyncio.Semaphore(TRANSCRIPTION_CONCURRENCY)
+
+# Created lazily inside the event loop that uses it
+_async_client = None
+
+
+# Uploads Whisper decodes itself; converting them first only costs an ffmpeg run (and a larger upload)
+WHISPER_FORMATS = frozenset({
+    '.flac', '.m4a', '.mp3', '.mp4', '.mpeg', '.mpga', '.oga', '.ogg', '.wav', '.webm'
+})
 
-        try:
-            subprocess.run(['ffmpeg', '-version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-        except (subprocess.SubprocessError, FileNotFoundError):
-            logger.warning("ffmpeg not found - skipping audio conversion")
-            return input_file
+# ffmpeg output options shared by file and in-memory conversion: WAV on stdout
+_FFMPEG_WAV_OUTPUT = [
+    '-ar', '16000',  # 16kHz sampling rate
+    '-ac', '1',  # mono
+    '-c:a', 'pcm_s16le',  # 16-bit PCM encoding
+    '-f', 'wav', 'pipe:1'
+]
 
+
+def convert_audio_to_wav(input_file):
+    """
+    Convert audio file to WAV format for better compatibility with Whisper
+    The WAV is streamed from ffmpeg's stdout, so nothing is written to disk
+    Returns an io.BytesIO with the WAV data, or input_file unchanged if conversion fails
+    """
+    try:
         # Use ffmpeg to convert the file
-        result = subprocess.run([
-            'ffmpeg', '-i', input_file,
-            '-ar', '16000',  # 16kHz sampling rate
-            '-ac', '1',  # mono
-            '-c:a', 'pcm_s16le',  # 16-bit PCM encoding
-            output_file
-        ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        process = subprocess.Popen(
+            ['ffmpeg', '-i', input_file, *_FFMPEG_WAV_OUTPUT],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        data, stderr = process.communicate()
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, process.args, data, stderr)
 
-        logger.info(f"Successfully converted {input_file} to {output_file}")
-        return output_file
+        logger.info(f"Successfully converted {input_file} to WAV ({len(data)} bytes)")
+        return io.BytesIO(data)
 
+    except FileNotFoundError:
+        logger.warning("ffmpeg not found - skipping audio conversion")
+        return input_file
     except subprocess.CalledProcessError as e:
         logger.error(f"Error converting audio: {str(e)}")
         return input_file
@@ -43,34 +73,195 @@ def convert_audio_to_wav(input_file):
         return input_file
 
 
-def transcribe_audio(audio_file_path):
+def convert_audio_bytes_to_wav(audio_bytes):
+    """
+    Convert in-memory audio to WAV through ffmpeg pipes, without touching the disk
+    Returns the WAV bytes, or None if conversion is not possible
+    """
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-i', 'pipe:0', *_FFMPEG_WAV_OUTPUT],
+            input=audio_bytes, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+
+        logger.info(f"Successfully converted {len(audio_bytes)} bytes of audio to WAV in memory")
+        return result.stdout
+
+    except FileNotFoundError:
+        logger.warning("ffmpeg not found - skipping audio conversion")
+        return None
+    except subprocess.CalledProcessError as e:
+        # Containers that need seeking (e.g. some m4a files) cannot be read from a pipe
+        logger.error(f"Error converting audio: {str(e)}")
+        return None
+
+
+def _cached_transcription(digest):
+    """Return the stored transcription for an audio digest, or None"""
+    with _transcription_cache_lock:
+        if digest in _transcription_cache:
+            return _transcription_cache[digest]
+
+    try:
+        with open(os.path.join(Config.TRANSCRIPTION_CACHE_FOLDER, f"{digest}.txt"), encoding='utf-8') as f:
+            transcription = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.warning(f"Could not read cached transcription {digest}: {str(e)}")
+        return None
+
+    with _transcription_cache_lock:
+        _transcription_cache[digest] = transcription
+    return transcription
+
+
+def _store_transcription(digest, transcription):
+    """Remember a transcription in memory and on disk; the file is replaced atomically"""
+    with _transcription_cache_lock:
+        _transcription_cache[digest] = transcription
+
+    try:
+        ensure_directory(Config.TRANSCRIPTION_CACHE_FOLDER)
+        fd, tmp_path = tempfile.mkstemp(dir=Config.TRANSCRIPTION_CACHE_FOLDER, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(transcription)
+        os.replace(tmp_path, os.path.join(Config.TRANSCRIPTION_CACHE_FOLDER, f"{digest}.txt"))
+    except OSError as e:
+        logger.warning(f"Could not store transcription {digest}: {str(e)}")
+
+
+def _audio_digest(audio_bytes):
+    """Cache key of audio as received; blake2b is cheap next to ffmpeg and Whisper"""
+    return hashlib.blake2b(audio_bytes, digest_size=16).hexdigest()
+
+
+def _read_audio(audio, filename=None):
+    """
+    Return (filename, bytes) of the audio as received, before any conversion
+    audio is a file path, or the audio itself as bytes/BytesIO
+    """
+    if isinstance(audio, (bytes, bytearray, io.BytesIO)):
+        audio_bytes = audio.getvalue() if isinstance(audio, io.BytesIO) else bytes(audio)
+        return filename or "audio.wav", audio_bytes
+
+    with open(audio, "rb") as audio_file:
+        return os.path.basename(audio), audio_file.read()
+
+
+def _prepare_upload(audio, filename, audio_bytes):
     """
-    Transcribe audio file using OpenAI Whisper API
+    Return (filename, bytes) of the audio to send to Whisper
+    Formats Whisper reads natively are sent as they are; anything else is converted to WAV when possible,
+    and Whisper still gets the original if ffmpeg cannot convert it
+    """
+    base_name, file_ext = os.path.splitext(filename)
+    if file_ext.lower() in WHISPER_FORMATS:
+        return filename, audio_bytes
+
+    if isinstance(audio, (bytes, bytearray, io.BytesIO)):
+        wav_bytes = convert_audio_bytes_to_wav(audio_bytes)
+        if wav_bytes:
+            return f"{base_name}.wav", wav_bytes
+    else:
+        # A file on disk can be seeked by ffmpeg, which some containers (e.g. m4a) need
+        converted = convert_audio_to_wav(audio)
+        if isinstance(converted, io.BytesIO):
+            return f"{base_name}.wav", converted.getvalue()
+
+    return filename, audio_bytes
+
+
+def _clean_transcription(transcription):
+    """
+    Post-process: Remove PLN currency hallucinations (Whisper adds "zł" when hearing Polish)
+    System uses GBP by default, so remove Polish currency markers
+    """
+    return transcription.replace(' zł', '').replace('zł', '').replace(' PLN', '').replace('PLN', '')
+
+
+def _get_async_client():
+    """Return the shared AsyncOpenAI client, creating it on first use"""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(api_key=Config.OPENAI_API_KEY)
+    return _async_client
+
+
+def transcribe_audio(audio, filename=None):
+    """
+    Transcribe audio using OpenAI Whisper API
+    audio is a file path, or the audio itself as bytes/BytesIO; filename (e.g. "voice.ogg")
+    tells Whisper the format of in-memory audio
+    Identical audio (by hash of the bytes as received) is served from the transcription cache
+    before any ffmpeg conversion
     Returns the transcription text
     """
     try:
+        filename, audio_bytes = _read_audio(audio, filename)
+
+        digest = _audio_digest(audio_bytes)
+        cached = _cached_transcription(digest)
+        if cached is not None:
+            logger.info(f"Transcription cache hit for {filename} ({digest[:12]})")
+            return cached
+
+        filename, audio_bytes = _prepare_upload(audio, filename, audio_bytes)
+
         client = OpenAI(api_key=Config.OPENAI_API_KEY)
-        # Convert audio to WAV format if needed
-        file_ext = os.path.splitext(audio_file_path)[1].lower()
-        if file_ext != '.wav':
-            audio_file_path = convert_audio_to_wav(audio_file_path)
 
-        # Open the audio file
-        with open(audio_file_path, "rb") as audio_file:
+        # Call the OpenAI Whisper API
+        response = client.audio.transcriptions.create(
+            model="whisper-1",
+            file=(filename, audio_bytes),
+            response_format="text",
+            language="pl"
+        )
+
+        # Log and return the transcription
+        transcription = _clean_transcription(response)
+
+        _store_transcription(digest, transcription)
+
+        logger.info(f"Transcription successful: {transcription[:100]}...")
+        return transcription
+
+    except Exception as e:
+        logger.error(f"Transcription error: {str(e)}", exc_info=True)
+        raise
+
+
+async def transcribe_audio_async(audio, filename=None):
+    """
+    Async counterpart of transcribe_audio, so several recordings can be transcribed concurrently
+    At most TRANSCRIPTION_CONCURRENCY Whisper requests run at once; conversion and cache file
+    access run in worker threads
+    Returns the transcription text
+    """
+    try:
+        async with _transcription_semaphore:
+            filename, audio_bytes = await asyncio.to_thread(_read_audio, audio, filename)
+
+            # Redelivered or re-sent recordings stop here, before ffmpeg and Whisper
+            digest = _audio_digest(audio_bytes)
+            cached = await asyncio.to_thread(_cached_transcription, digest)
+            if cached is not None:
+                logger.info(f"Transcription cache hit for {filename} ({digest[:12]})")
+                return cached
+
+            filename, audio_bytes = await asyncio.to_thread(_prepare_upload, audio, filename, audio_bytes)
+
             # Call the OpenAI Whisper API
-            response = client.audio.transcriptions.create(
+            response = await _get_async_client().audio.transcriptions.create(
                 model="whisper-1",
-                file=audio_file,
+                file=(filename, audio_bytes),
                 response_format="text",
                 language="pl"
             )
 
-        # Log and return the transcription
-        transcription = response
+        transcription = _clean_transcription(response)
 
-        # Post-process: Remove PLN currency hallucinations (Whisper adds "zł" when hearing Polish)
-        # System uses GBP by default, so remove Polish currency markers
-        transcription = transcription.replace(' zł', '').replace('zł', '').replace(' PLN', '').replace('PLN', '')
+        await asyncio.to_thread(_store_transcription, digest, transcription)
 
         logger.info(f"Transcription successful: {transcription[:100]}...")
         return transcription
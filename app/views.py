@@ -1,8 +1,23 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, Response, current_app, render_template, request
 
 # Create Blueprint for views
 views_bp = Blueprint('views', __name__)
 
+# Rendered pages that take no per-request data: (template, script root) -> UTF-8 bytes
+_PAGE_CACHE = {}
+
+
+def _render_static_page(template):
+    """Render a template once per script root and reuse the bytes; debug mode re-renders for live edits"""
+    if current_app.debug:
+        return render_template(template)
+
+    key = (template, request.script_root)
+    body = _PAGE_CACHE.get(key)
+    if body is None:
+        body = _PAGE_CACHE[key] = render_template(template).encode('utf-8')
+    return Response(body, mimetype='text/html')
+
 
 @views_bp.route('/confirm-category/<int:expense_id>/<category>', methods=['GET'])
 def confirm_category_page(expense_id, category):
@@ -11,20 +26,20 @@ def confirm_category_page(expense_id, category):
 
 @views_bp.route('/')
 def index():
-    return render_template('index.html')
+    return _render_static_page('index.html')
 
 
 @views_bp.route('/index')
 def index_alt():
-    return render_template('index.html')
+    return _render_static_page('index.html')
 
 
 @views_bp.route('/model-metrics')
 def model_metrics():
-    return render_template('model_metrics.html')
+    return _render_static_page('model_metrics.html')
 
 
 # Legacy compatibility function
 def register_view_routes(app):
     """Legacy function for backward compatibility"""
-    pass
\ No newline at end of file
+    pass
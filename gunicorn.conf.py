@@ -0,0 +1,52 @@
+"""
+Gunicorn settings for serving the Flask app in production
+Start with: gunicorn -c gunicorn.conf.py
+"""
+
+import os
+import fcntl
+
+wsgi_app = 'run:app'
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Import the app once in the master; workers are forked from it and share its memory copy-on-write
+preload_app = True
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Long enough for a Whisper transcription plus the OpenAI extraction
+timeout = 120
+graceful_timeout = 30
+
+
+# Production start: the scheduler runs unless ENABLE_SCHEDULER=0 is set explicitly
+os.environ.setdefault('ENABLE_SCHEDULER', '1')
+
+# Held by the one worker that runs the training scheduler; the OS releases it when that worker exits
+SCHEDULER_LOCK_FILE = os.environ.get('SCHEDULER_LOCK_FILE', '/tmp/expenses-scheduler.lock')
+_scheduler_lock = None
+
+
+def post_worker_init(worker):
+    """
+    Start the training scheduler in exactly one worker, the first to take the lock file
+    Not in the master: training is heavy and its threads and connections would be forked into every worker
+    (DB pools preloaded in the master are dropped in each worker by DBManager itself)
+    """
+    global _scheduler_lock
+    from run import schedule_model_training, scheduler_enabled
+
+    if not scheduler_enabled():
+        return
+
+    lock_file = open(SCHEDULER_LOCK_FILE, 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return
+
+    _scheduler_lock = lock_file
+    schedule_model_training()
+    worker.log.info(f"Model training scheduler started in worker {worker.pid}")
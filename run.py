@@ -1,13 +1,20 @@
 import os
+import atexit
+import importlib
+import signal
 import logging
 import threading
+import subprocess
 import schedule
-import time
 import sys
 
-from app import create_app
+# The dev server is a single process, so it may rotate app.log itself (the debug reloader's watcher
+# process only logs restarts); gunicorn imports this module too and keeps the default
+if __name__ == '__main__':
+    os.environ.setdefault('LOG_ROTATE', '1')
+
+from app import create_app, configure_logging
 from app.database.db_manager import DBManager
-from app.core.expense_learner import ExpenseLearner
 from app.config import Config
 
 # Check configuration
@@ -20,43 +27,93 @@ except Exception as e:
 # Initialize Flask using the factory pattern
 app = create_app()
 
-# Logging configuration
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.FileHandler("app.log"), logging.StreamHandler()]
-)
+# Logging configuration (queued, rotating app.log; a no-op once the app package has set it up)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# Database initialization
-config = Config()
-db_name = config.DB_NAME
+# Database for scheduled training, connected on the first training run rather than at import
+_DB_MANAGER = None
+
+
+def _get_db_manager():
+    """Return the DBManager used by scheduled training, creating it on first use"""
+    global _DB_MANAGER
+    if _DB_MANAGER is None:
+        _DB_MANAGER = DBManager(
+            host=app.config['DB_HOST'],
+            user=app.config['DB_USER'],
+            password=app.config['DB_PASSWORD'],
+            database=Config().DB_NAME
+        )
+    return _DB_MANAGER
+
+
+# HTML body of the scheduled-training email, in the Flask templates folder
+TRAINING_EMAIL_TEMPLATE = 'training_complete_email.html'
+
+# Set on shutdown so the scheduler thread stops waiting and exits promptly
+_SHUTDOWN = threading.Event()
+atexit.register(_SHUTDOWN.set)
+
+
+def _handle_sigterm(signum, frame):
+    """Stop the scheduler, then exit as SIGTERM normally would"""
+    _SHUTDOWN.set()
+    sys.exit(128 + signum)
+
+
+# Learner used by scheduled training, chosen with the LEARNER environment variable;
+# only the selected module is imported
+LEARNER_CLASSES = {
+    'qdrant': ('app.core.vector_expense_learner', 'QdrantExpenseLearner'),
+    'tfidf': ('app.core.expense_learner', 'ExpenseLearner')
+}
+LEARNER = os.environ.get('LEARNER', 'qdrant')
+
+# Shared by scheduled runs; for Qdrant the embedding model and client are loaded once
+_LEARNER = None
+_LEARNER_LOCK = threading.Lock()
+
+
+def _learner_factory():
+    """Return the learner class selected by LEARNER"""
+    module_name, class_name = LEARNER_CLASSES[LEARNER]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _get_learner():
+    """Return the shared learner, creating it on first training run"""
+    global _LEARNER
+    with _LEARNER_LOCK:
+        if _LEARNER is None:
+            _LEARNER = _learner_factory()(_get_db_manager())
+        return _LEARNER
+
+
+def scheduler_enabled():
+    """
+    Whether this process should run the training scheduler
+    Off unless ENABLE_SCHEDULER=1, and never in debug mode, where every reload would start another one
+    """
+    return os.environ.get('ENABLE_SCHEDULER', '0') == '1' and not app.debug
 
-db_manager = DBManager(
-    host=app.config['DB_HOST'],
-    user=app.config['DB_USER'],
-    password=app.config['DB_PASSWORD'],
-    database=db_name
-)
 
 # Function for scheduling model training
 def schedule_model_training():
     def train_job():
-        logger.info("Running scheduled model training - using Qdrant vector model")
+        logger.info(f"Running scheduled model training - using {LEARNER} model")
 
         training_success = False
 
         try:
-            from app.core.vector_expense_learner import QdrantExpenseLearner
-            learner = QdrantExpenseLearner(db_manager)
-            training_success = learner.train_model()
-            logger.info("Scheduled training completed using Qdrant vector model")
+            training_success = _get_learner().train_model()
+            logger.info(f"Scheduled training completed using {LEARNER} model")
         except ImportError as e:
-            logger.error(f"CRITICAL: Qdrant libraries not installed: {str(e)}")
-            logger.error("Training aborted - Qdrant is required!")
+            logger.error(f"CRITICAL: libraries for the {LEARNER} learner not installed: {str(e)}")
+            logger.error("Training aborted!")
             return
         except Exception as e:
-            logger.error(f"Error during Qdrant training: {str(e)}", exc_info=True)
+            logger.error(f"Error during {LEARNER} training: {str(e)}", exc_info=True)
             return
 
         # Send email notification after training
@@ -65,7 +122,7 @@ def schedule_model_training():
                 from app.services.email_service import send_email
 
                 # Get latest metrics
-                metrics = db_manager.get_latest_model_metrics()
+                metrics = _get_db_manager().get_latest_model_metrics()
 
                 if metrics:
                     # Extract confusion matrix data
@@ -74,54 +131,13 @@ def schedule_model_training():
                         import json
                         confusion_data = json.loads(confusion_data)
 
-                    cv_scores = confusion_data.get('cv_scores', [])
-                    cv_scores_str = ', '.join([f"{score:.4f}" for score in cv_scores]) if cv_scores else 'N/A'
-
-                    # Format email body
-                    email_body = f"""
-                    <html>
-                        <body>
-                            <h2>Model Training Completed Successfully</h2>
-                            <p>The scheduled model training has been completed.</p>
-
-                            <h3>Training Results:</h3>
-                            <table border="1" cellpadding="5" cellspacing="0" style="border-collapse: collapse;">
-                                <tr>
-                                    <td><strong>Training Type:</strong></td>
-                                    <td>{metrics.get('training_type', 'N/A')}</td>
-                                </tr>
-                                <tr>
-                                    <td><strong>Accuracy:</strong></td>
-                                    <td>{metrics.get('accuracy', 0):.4f} ({metrics.get('accuracy', 0)*100:.2f}%)</td>
-                                </tr>
-                                <tr>
-                                    <td><strong>Samples Count:</strong></td>
-                                    <td>{metrics.get('samples_count', 0)}</td>
-                                </tr>
-                                <tr>
-                                    <td><strong>Categories Count:</strong></td>
-                                    <td>{metrics.get('categories_count', 0)}</td>
-                                </tr>
-                                <tr>
-                                    <td><strong>Cross-Validation Scores:</strong></td>
-                                    <td>{cv_scores_str}</td>
-                                </tr>
-                                <tr>
-                                    <td><strong>Training Date:</strong></td>
-                                    <td>{metrics.get('created_at', 'N/A')}</td>
-                                </tr>
-                                <tr>
-                                    <td><strong>Notes:</strong></td>
-                                    <td>{metrics.get('notes', 'N/A')}</td>
-                                </tr>
-                            </table>
-
-                            <p style="margin-top: 20px;">
-                                <small>This is an automated message from your Expense Tracking System.</small>
-                            </p>
-                        </body>
-                    </html>
-                    """
+                    # Format email body (compiled once and cached by Flask's Jinja environment);
+                    # the whole body, CV scores included, is produced by a single join in render()
+                    email_body = app.jinja_env.get_template(TRAINING_EMAIL_TEMPLATE).render(
+                        metrics=metrics,
+                        accuracy=metrics.get('accuracy', 0),
+                        cv_scores=confusion_data.get('cv_scores', [])
+                    )
 
                     # Send email
                     send_email(
@@ -139,24 +155,47 @@ def schedule_model_training():
     schedule.every().sunday.at("13:00").do(train_job)
 
     def run_scheduler():
+        # Sleep until the next job is due instead of polling, so it runs on time;
+        # waiting on _SHUTDOWN lets shutdown interrupt the sleep
         while True:
+            idle_seconds = schedule.idle_seconds()
+            if idle_seconds is None:
+                if _SHUTDOWN.wait(3600):
+                    return
+                continue
+            if idle_seconds > 0 and _SHUTDOWN.wait(idle_seconds):
+                return
             schedule.run_pending()
-            time.sleep(3600)
 
     threading.Thread(target=run_scheduler, daemon=True).start()
 
+
+# Run by the Discord bot's process; it imports the bot only, not this file
+DISCORD_BOT_ENTRY = "from app.services.discord_bot import run_discord_bot; run_discord_bot()"
+
+
 def start_discord_bot():
-    """Start Discord bot in a separate thread"""
+    """
+    Start Discord bot in a separate process, so it does not share the GIL with Flask
+    State is shared through the database only
+    """
     if os.environ.get('ALWAYSDATA_ENV'):
         logger.info("Discord bot disabled on AlwaysData")
         return
 
     try:
-        from app.services.discord_bot import run_discord_bot
-        logger.info("Starting Discord bot in background thread")
-        discord_thread = threading.Thread(target=run_discord_bot)
-        discord_thread.daemon = True
-        discord_thread.start()
+        # Fail here rather than in the child if the bot cannot be imported
+        importlib.import_module('app.services.discord_bot')
+        logger.info("Starting Discord bot in background process")
+        # A fresh interpreter rather than a fork, so the child does not inherit this process's pooled
+        # DB connections; not a multiprocessing spawn either, which would re-run this file in the child
+        discord_process = subprocess.Popen(
+            [sys.executable, '-c', DISCORD_BOT_ENTRY],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            # Only this process rotates app.log; the bot reopens it after a rollover
+            env={**os.environ, 'LOG_ROTATE': '0'}
+        )
+        atexit.register(discord_process.terminate)
     except ImportError:
         logger.warning("Discord bot module not found - bot will not start")
     except Exception as e:
@@ -164,14 +203,19 @@ def start_discord_bot():
 
 
 if __name__ == '__main__':
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+
     if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' or not app.config['DEBUG']:
-        try:
-            schedule_model_training()
-            logger.info("Model training scheduler started")
-        except ImportError:
-            logger.warning("Schedule module not found - model training scheduler not started")
-        except Exception as e:
-            logger.error(f"Error starting model training scheduler: {str(e)}")
+        if scheduler_enabled():
+            try:
+                schedule_model_training()
+                logger.info("Model training scheduler started")
+            except ImportError:
+                logger.warning("Schedule module not found - model training scheduler not started")
+            except Exception as e:
+                logger.error(f"Error starting model training scheduler: {str(e)}")
+        else:
+            logger.info("Model training scheduler disabled (set ENABLE_SCHEDULER=1 outside debug mode)")
 
         try:
             start_discord_bot()
@@ -179,6 +223,6 @@ if __name__ == '__main__':
         except Exception as e:
             logger.error(f"Error starting Discord bot: {str(e)}", exc_info=True)
 
-    # Run the Flask application
+    # Run the Flask development server; production uses gunicorn.conf.py
     logger.info(f"Starting Flask application on port {app.config['PORT']}")
     app.run(debug=app.config['DEBUG'], host='0.0.0.0', port=app.config['PORT'])
\ No newline at end of file
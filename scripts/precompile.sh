@@ -0,0 +1,8 @@
+#!/bin/sh
+# Byte-compile the project after a deploy, before the workers restart, so their first
+# imports load __pycache__/*.pyc instead of parsing and compiling every module.
+# Use the same interpreter as the WSGI server (.pyc files are per Python version):
+#   PYTHON=/path/to/python3 sh scripts/precompile.sh
+set -e
+cd "$(dirname "$0")/.."
+"${PYTHON:-python3}" -m compileall -q -j 0 app utils wsgi.py run.py discord_service.py gunicorn.conf.py
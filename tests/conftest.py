@@ -0,0 +1,11 @@
+import os
+import tempfile
+
+# Set before the app package is imported: no spaCy models or Discord bot, and logs out of the repo
+os.environ.setdefault('DISABLE_SPACY', 'true')
+os.environ.setdefault('DISABLE_DISCORD', 'true')
+os.environ.setdefault('LOG_FILE', os.path.join(tempfile.gettempdir(), 'expenses-tests.log'))
+os.environ.setdefault('LOG_CONSOLE', '0')
+
+# app.nlp and app.services import each other; loading services first resolves the cycle
+import app.services  # noqa: E402,F401
@@ -0,0 +1,53 @@
+import pytest
+
+from app.services import category_service
+from app.services.category_service import CategoryService
+
+
+@pytest.fixture
+def service():
+    return CategoryService(db_manager=None, openai_client=object())
+
+
+@pytest.mark.parametrize('name, expected', [
+    ("kid's toys", "Kid's Toys"),
+    ('  home   office ', 'Home Office'),
+    ('GROCERIES', 'Groceries'),
+    ('', ''),
+    ('   ', ''),
+])
+def test_normalize_category_name(service, name, expected):
+    assert service._normalize_category_name(name) == expected
+
+
+@pytest.fixture
+def detect(monkeypatch):
+    """Module-level detect_category_command with the DB and OpenAI clients stubbed out"""
+    calls = []
+
+    def create_completion(self, tokens_estimate, **kwargs):
+        calls.append(kwargs['messages'][-1]['content'])
+        raise RuntimeError('OpenAI unavailable')
+
+    monkeypatch.setattr(category_service, 'DBManager', lambda **kwargs: None)
+    monkeypatch.setattr(category_service, 'OpenAI', lambda **kwargs: object())
+    monkeypatch.setattr(CategoryService, '_match_existing_category', lambda self, name: None)
+    monkeypatch.setattr(CategoryService, '_create_completion', create_completion)
+    category_service._detect_cache.clear()
+    yield category_service.detect_category_command, calls
+    category_service._detect_cache.clear()
+
+
+def test_detect_category_command_skips_cache_after_failed_translation(detect):
+    detect_category_command, calls = detect
+
+    assert detect_category_command('dodaj kategorię zwierzęta') == (True, 'Zwierzęta')
+    assert detect_category_command('dodaj kategorię zwierzęta') == (True, 'Zwierzęta')
+    assert len(calls) == 2
+
+
+def test_detect_category_command_caches_plain_text(detect):
+    detect_category_command, calls = detect
+
+    assert detect_category_command('chleb 5 funtów') == (False, None)
+    assert 'chleb 5 funtów' in category_service._detect_cache
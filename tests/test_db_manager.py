@@ -0,0 +1,98 @@
+import pymysql
+import pytest
+
+from app.database.db_manager import DBManager
+
+
+class FailingCursor:
+    """Server-side cursor stand-in that loses the connection after the first batch"""
+
+    def __init__(self, rows):
+        self.batches = [rows]
+
+    def execute(self, query):
+        pass
+
+    def fetchmany(self, size):
+        if self.batches:
+            return self.batches.pop(0)
+        raise pymysql.err.OperationalError(2013, 'Lost connection to MySQL server during query')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self, cursor_class=None):
+        return self._cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def db_manager():
+    manager = DBManager.__new__(DBManager)
+    rows = [{'id': 1, 'category': 'Groceries', 'transcription': 'milk'}]
+    manager._get_connection = lambda: FakeConnection(FailingCursor(rows))
+    return manager
+
+
+def test_iter_training_expenses_reraises_mid_stream_error(db_manager):
+    with pytest.raises(pymysql.err.OperationalError):
+        list(db_manager.iter_training_expenses())
+
+
+def test_get_all_expenses_for_training_drops_partial_scan(db_manager):
+    assert db_manager.get_all_expenses_for_training() == []
+
+
+class ListingCursor:
+    """Cursor stand-in answering the review count and one listing page"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchone(self):
+        return {'count': 0}
+
+    def fetchall(self):
+        return [dict(row) for row in self.rows]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def listing_manager():
+    manager = DBManager.__new__(DBManager)
+    manager._has_vendor_fulltext = False
+    rows = [{'id': 7, 'date': '2024-01-02', 'total_rows': 3}]
+    manager._get_connection = lambda: FakeConnection(ListingCursor(rows))
+    return manager
+
+
+def test_get_expenses_reports_total_for_offset_pages(listing_manager):
+    expenses, total, _ = listing_manager.get_expenses(page=1, per_page=1)
+    assert total == 3
+    assert 'total_rows' not in expenses[0]
+
+
+def test_get_expenses_has_no_total_for_keyset_pages(listing_manager):
+    _, total, _ = listing_manager.get_expenses(per_page=1, after_date='2024-01-01', after_id=6)
+    assert total is None
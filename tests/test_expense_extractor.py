@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from app.nlp.expense_extractor import _MONEY_RE, ExpenseBatcher
+
+
+@pytest.mark.parametrize('text', [
+    'kawa 80 pence',
+    'kawa 80p',
+    'bułka 50 pensów',
+    'obiad £12',
+    'obiad £ 12.50',
+    'zakupy 25 funtów',
+    'zakupy 25,99 funtów',
+    'bilet 3 pounds',
+    'piwo 5',
+])
+def test_money_precheck_accepts_amounts(text):
+    assert _MONEY_RE.search(text)
+
+
+@pytest.mark.parametrize('text', [
+    'cześć, jak się masz',
+    'pamiętaj o zakupach',
+])
+def test_money_precheck_rejects_text_without_amount(text):
+    assert not _MONEY_RE.search(text)
+
+
+def test_cancelled_dispatch_resolves_pending_futures(monkeypatch):
+    async def cancelled(item):
+        raise asyncio.CancelledError
+
+    monkeypatch.setattr(ExpenseBatcher, '_extract_single', staticmethod(cancelled))
+
+    async def run():
+        future = asyncio.get_running_loop().create_future()
+        with pytest.raises(asyncio.CancelledError):
+            await ExpenseBatcher()._dispatch([('kawa 3 funty', [], None, None, future)])
+        return future.result()
+
+    assert asyncio.run(run()) is None
@@ -0,0 +1,16 @@
+import pytest
+
+from app.nlp.nlp_category_parser import extract_date_range_from_text
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('raport 2023 rok podatkowy 2023 2024', ('2023-04-06', '2024-04-05')),
+    ('w 2022 tax year 2022/2023', ('2022-04-06', '2023-04-05')),
+    ('rok podatkowy 2023-2024', ('2023-04-06', '2024-04-05')),
+    ('2021 rok obrachunkowy', ('2021-04-01', '2022-03-31')),
+    ('raport za 2023 rok', ('2023-01-01', '2023-12-31')),
+    ('raport między 2023 a 2024 rok', ('2024-01-01', '2024-12-31')),
+    ('raport from 2022 to 2023 rok', ('2023-01-01', '2023-12-31')),
+])
+def test_overlapping_date_patterns(text, expected):
+    assert extract_date_range_from_text(text) == expected
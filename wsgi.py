@@ -1,83 +1,250 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-WSGI entry point for AlwaysData hosting
+WSGI entry point
+The deployment is chosen with WSGI_PROFILE (default: alwaysdata), see WSGI_PROFILES
 """
 
 import sys
 import os
-import warnings
+import json
 import logging
-
-warnings.filterwarnings('ignore')
-
-# Add project path to Python path
-sys.path.insert(0, '/home/robgro/expenses')
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/home/robgro/expenses/app.log'),
-        logging.StreamHandler()
-    ]
-)
+import importlib
+import threading
+import types
+
+# The project path normally comes from expenses.pth in site-packages (see README); only
+# append it as a fallback, so imports do not scan the project directory before the stdlib
+PROJECT_PATH = '/home/robgro/expenses'
+if PROJECT_PATH not in sys.path:
+    sys.path.append(PROJECT_PATH)
+
+# Deployment profiles: environment defaults, default log file, whether records are also written to
+# stderr, and the URL prefix the app is mounted under
+WSGI_PROFILES = {
+    # DISABLE HEAVY MODULES FOR ALWAYSDATA (keep Qdrant enabled for vector model)
+    'alwaysdata': {
+        'env': {
+            'DISABLE_SPACY': 'true',
+            'DISABLE_DISCORD': 'true',
+            'ALWAYSDATA_ENV': 'true',
+            'MINIMAL_MODE': 'true'
+        },
+        'log_file': '/home/robgro/expenses/app.log',
+        # The server copies stderr to its own log, so console output would write every record twice
+        'log_console': False,
+        'prefix': '/expenses'
+    },
+    'local': {
+        'env': {},
+        'log_file': 'app.log',
+        'log_console': True,
+        'prefix': ''
+    }
+}
+
+WSGI_PROFILE = os.environ.get('WSGI_PROFILE', 'alwaysdata')
+if WSGI_PROFILE not in WSGI_PROFILES:
+    raise RuntimeError(f"Unknown WSGI_PROFILE {WSGI_PROFILE!r}, expected one of: {', '.join(WSGI_PROFILES)}")
+
+# Defaults only: values already set (hosting configuration, or a preserved environment
+# on a graceful reload) are left alone
+for name, value in WSGI_PROFILES[WSGI_PROFILE]['env'].items():
+    os.environ.setdefault(name, value)
+
+# Configure logging (queued writes to a rotating app.log; a no-op if it is already set up)
+os.environ.setdefault('LOG_FILE', WSGI_PROFILES[WSGI_PROFILE]['log_file'])
+os.environ.setdefault('LOG_CONSOLE', '1' if WSGI_PROFILES[WSGI_PROFILE]['log_console'] else '0')
+from app import configure_logging
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# DISABLE HEAVY MODULES FOR ALWAYSDATA (keep Qdrant enabled for vector model)
-os.environ['DISABLE_SPACY'] = 'true'
-os.environ['DISABLE_DISCORD'] = 'true'
-os.environ['ALWAYSDATA_ENV'] = 'true'
-os.environ['MINIMAL_MODE'] = 'true'
 
-logger.info("=" * 60)
-logger.info("Starting AlwaysData WSGI application")
-logger.info("=" * 60)
-
-# Environment variables are set in AlwaysData configuration
-# No need to load from .env file
-logger.info("Using environment variables from AlwaysData configuration")
-
-# Import the real application
-try:
-    from app import create_app
-    app = create_app()
-
-    # Middleware to fix SCRIPT_NAME for AlwaysData subdirectory mounting
-    class PrefixMiddleware:
-        def __init__(self, app, prefix=''):
-            self.app = app
-            self.prefix = prefix
-
-        def __call__(self, environ, start_response):
-            # Set SCRIPT_NAME so Flask generates correct URLs
-            environ['SCRIPT_NAME'] = self.prefix
-            return self.app(environ, start_response)
-
-    # Wrap application with middleware
-    application = PrefixMiddleware(app, prefix='/expenses')
-    logger.info("✅ Application created successfully with /expenses prefix")
-except Exception as e:
-    logger.error(f"❌ Failed to create application: {e}", exc_info=True)
-
-    # Fallback minimal application
-    from flask import Flask, jsonify
-    application = Flask(__name__)
-
-    error_message = str(e)
-
-    @application.route('/')
-    def fallback_index():
-        return jsonify({
-            'status': 'error',
-            'message': 'Application failed to initialize',
-            'error': error_message,
-            'help': 'Check logs at /home/robgro/expenses/app.log'
-        }), 500
+def prefix_middleware(app, prefix):
+    """Middleware to fix SCRIPT_NAME when the app is mounted in a subdirectory (AlwaysData)"""
+    def middleware(environ, start_response):
+        # Set SCRIPT_NAME so Flask generates correct URLs
+        environ['SCRIPT_NAME'] = prefix
+        return app(environ, start_response)
+    return middleware
+
+
+# Holds the created application in sys.modules, so it survives this file being re-executed
+# in the same interpreter (WSGI script reloads)
+CACHED_APP_MODULE = '_expenses_cached_app'
+
+# Sources the created application depends on; other files there (.pyc written by the imports
+# themselves, logs, data) must not change the cache key
+APP_SOURCE_DIRS = ('app', 'templates')
+APP_SOURCE_EXTENSIONS = ('.py', '.html')
+
+
+def _app_source_mtime():
+    """Newest modification time among the application's sources"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    newest = 0.0
+    for source_dir in APP_SOURCE_DIRS:
+        for dir_path, dir_names, file_names in os.walk(os.path.join(base_dir, source_dir)):
+            if '__pycache__' in dir_names:
+                dir_names.remove('__pycache__')
+            for file_name in file_names:
+                if file_name.endswith(APP_SOURCE_EXTENSIONS):
+                    newest = max(newest, os.path.getmtime(os.path.join(dir_path, file_name)))
+    return newest
+
+
+def build_application(profile):
+    """
+    Create the WSGI application for a deployment profile
+    An application created earlier in this interpreter is reused while its sources are unchanged
+    Falls back to a minimal application reporting the error if the real one cannot be created
+    """
+    settings = WSGI_PROFILES[profile]
+
+    cache_key = (profile, _app_source_mtime())
+    cached = sys.modules.get(CACHED_APP_MODULE)
+    if cached is not None and cached.key == cache_key:
+        logger.info("Reusing the application created before the reload")
+        return cached.application
+
+    try:
+        from app import create_app
+        application = create_app()
+
+        if settings['prefix']:
+            # Wrap application with middleware
+            application = prefix_middleware(application, settings['prefix'])
+        logger.info(f"✅ Application created successfully with {settings['prefix'] or 'no'} prefix")
+        _warm_up(application)
+
+        cached = types.ModuleType(CACHED_APP_MODULE)
+        cached.key = cache_key
+        cached.application = application
+        sys.modules[CACHED_APP_MODULE] = cached
+        return application
+    except Exception as e:
+        logger.error(f"❌ Failed to create application: {e}", exc_info=True)
+        return _build_fallback(e)
+
+
+def _warm_up(application):
+    """
+    Send one health check through a new application before it serves traffic, so the first
+    real request does not pay for what Flask initialises on first dispatch
+    """
+    try:
+        from werkzeug.test import Client
+        response = Client(application).get('/api/health')
+        logger.info(f"Warm-up request answered {response.status_code}")
+    except Exception as e:
+        logger.warning(f"Warm-up request failed (non-fatal): {e}")
+
+
+def _build_fallback(error):
+    """
+    Minimal application answering every request with the startup error
+    Plain WSGI, so it works even when Flask itself failed to import
+    """
+    body = json.dumps({
+        'status': 'error',
+        'message': 'Application failed to initialize',
+        'error': str(error),
+        'help': f"Check logs at {os.environ['LOG_FILE']}"
+    }).encode('utf-8')
+
+    def fallback(environ, start_response):
+        start_response('500 INTERNAL SERVER ERROR', [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(body)))
+        ])
+        return [body]
 
     logger.error("Using fallback application")
-
-logger.info("=" * 60)
-logger.info("WSGI application ready")
-logger.info("=" * 60)
\ No newline at end of file
+    return fallback
+
+
+# Independent third-party packages behind the app's modules; the prewarm thread imports them
+# in parallel before create_app(), so their file reads overlap instead of running one after another
+PREWARM_MODULES = (
+    'flask',
+    'pandas',
+    'sklearn.pipeline',
+    'sklearn.feature_extraction.text',
+    'seaborn',
+    'reportlab.platypus',
+    'openai',
+    'pymysql'
+)
+PREWARM_IMPORT_WORKERS = 4
+
+
+def _prewarm_import(module_name):
+    """
+    Import a module ahead of create_app(); a failure is left for create_app() to report
+    (an import that loses a race with another prewarm import is simply retried there)
+    """
+    try:
+        importlib.import_module(module_name)
+    except Exception as e:
+        logger.warning(f"Could not preload {module_name}: {str(e)}")
+
+
+class LazyApplication:
+    """
+    WSGI callable that builds the real application on the first request
+    The server can bind and accept before create_app() pulls in the app's modules
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self._application = None
+        self._lock = threading.Lock()
+
+    def _get_application(self):
+        """Return the real application, building it once"""
+        if self._application is None:
+            with self._lock:
+                if self._application is None:
+                    self._application = build_application(self.profile)
+                    logger.info("WSGI application ready")
+        return self._application
+
+    def __call__(self, environ, start_response):
+        return self._get_application()(environ, start_response)
+
+    def prewarm(self):
+        """
+        Build the application in a background thread while the server starts accepting
+        A request arriving earlier simply waits on the lock for the same build
+        """
+        def _prewarm():
+            try:
+                # Hold the build lock: a request arriving now waits rather than importing the same
+                # packages concurrently (circular imports inside them can then fail)
+                with self._lock:
+                    if self._application is None:
+                        from concurrent.futures import ThreadPoolExecutor
+                        with ThreadPoolExecutor(max_workers=PREWARM_IMPORT_WORKERS,
+                                                thread_name_prefix="wsgi_prewarm_import") as executor:
+                            list(executor.map(_prewarm_import, PREWARM_MODULES))
+
+                self._get_application()
+                logger.info("WSGI application prewarmed")
+            except Exception as e:
+                logger.warning(f"WSGI prewarm failed: {str(e)}")
+
+        threading.Thread(target=_prewarm, name="wsgi_prewarm", daemon=True).start()
+
+
+# Environment variables are set in the hosting configuration
+# No need to load from .env file
+logger.info("\n".join((
+    "=" * 60,
+    f"Starting WSGI application ({WSGI_PROFILE} profile)",
+    "=" * 60,
+    "Using environment variables from the hosting configuration"
+)))
+
+# The app itself is created in the background, or by the first request if that comes sooner
+application = LazyApplication(WSGI_PROFILE)
+application.prewarm()